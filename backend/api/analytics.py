@@ -0,0 +1,115 @@
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from .column_store import COLUMNS, ColumnStoreWriter, has_store, read_column
+from .models import EquipmentRecord, EquipmentType
+
+FETCH_ROWS = 10000
+
+
+def metric_column(dataset_id, metric):
+    """One metric of a dataset as a float64 array, in upload (id) order.
+
+    Memory-mapped from the dataset's column store; datasets ingested before
+    column stores existed are read from the database instead.
+    """
+    column = read_column(dataset_id, metric)
+    if column is not None:
+        return column
+    values = (EquipmentRecord.objects.filter(dataset_id=dataset_id).order_by('id')
+              .values_list(metric, flat=True).iterator(chunk_size=FETCH_ROWS))
+    return np.fromiter(values, dtype='float64')
+
+
+def type_column(dataset_id):
+    """Equipment types of a dataset's column store as a pandas Categorical of
+    names (None without a store)."""
+    ids = read_column(dataset_id, 'equipment_type')
+    if ids is None:
+        return None
+    names = EquipmentType.names()
+    type_ids = np.sort(np.fromiter(names, dtype=ids.dtype, count=len(names)))
+    categories = [names[i] for i in type_ids.tolist()]
+    return pd.Categorical.from_codes(np.searchsorted(type_ids, ids), categories).remove_unused_categories()
+
+
+def store_columns(dataset_id, fields):
+    """``{field: column}`` from the column store, or None if it cannot serve
+    every one of ``fields``."""
+    if not set(fields) <= COLUMNS.keys() or not has_store(dataset_id):
+        return None
+    return {f: type_column(dataset_id) if f == 'equipment_type' else read_column(dataset_id, f)
+            for f in fields}
+
+
+def column_frame(dataset_id, fields):
+    """DataFrame of metric and type ``fields``, from the column store or, for
+    datasets without one, from the database (types as a Categorical either way)."""
+    columns = store_columns(dataset_id, fields)
+    if columns is not None:
+        return pd.DataFrame(columns)
+    rows = EquipmentRecord.objects.filter(dataset_id=dataset_id).order_by('id').rows(fields, FETCH_ROWS)
+    frame = pd.DataFrame.from_records(rows, columns=fields)
+    if 'equipment_type' in fields:
+        frame['equipment_type'] = frame['equipment_type'].astype('category')
+    return frame
+
+
+def build_store(dataset_id):
+    """Write the column store of an already ingested dataset from its records."""
+    fields = list(COLUMNS)
+    rows = (EquipmentRecord.objects.filter(dataset_id=dataset_id).order_by('id')
+            .values_list(*fields).iterator(chunk_size=FETCH_ROWS))
+    writer = ColumnStoreWriter(dataset_id)
+    try:
+        while batch := list(islice(rows, FETCH_ROWS)):
+            writer.append(dict(zip(fields, zip(*batch))))
+    except Exception:
+        writer.abort()
+        raise
+    writer.commit()
+
+
+def _bucket_edges(n, threshold):
+    """Starts of the ``threshold - 2`` LTTB buckets over points 1..n-2, plus
+    ``n - 1`` as the end of the last. Integer arithmetic, so the last edge is
+    exactly ``n - 1`` (a float step can round it down and drop point n-2)."""
+    return (np.arange(threshold - 1, dtype=np.int64) * (n - 2)) // (threshold - 2) + 1
+
+
+def lttb(y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of ``y`` plotted against its index.
+
+    Returns the indices of the ``threshold`` points to keep (first and last are
+    always kept). Each bucket is scored with one vectorized triangle-area pass,
+    so the Python loop runs ``threshold`` times whatever the length of ``y``.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, threshold)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = (next_start + next_end - 1) / 2.0
+        avg_y = y[next_start:next_end].mean()
+
+        xs = np.arange(start, end)
+        area = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(y, points):
+    """``(x, y)`` of the LTTB downsample of ``y`` (x = row position)."""
+    keep = lttb(y, points)
+    return keep, y[keep]
@@ -0,0 +1,111 @@
+"""Report charts drawn with matplotlib's object-oriented API (no pyplot).
+
+pyplot keeps a global "current figure" and its style calls mutate process-wide
+rcParams, so it is neither thread-safe nor cheap per request. Here the report
+style is applied once when the module is imported and every thread draws into
+its own Figure/Agg canvas pair, which is cleared and reused between reports.
+"""
+import io
+import threading
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+
+STYLE = 'seaborn-v0_8-whitegrid'
+TREND_SIZE = (8, 3.5)
+BREAKDOWN_SIZE = (8, 3.5)
+DPI = 150
+TEAL = '#0d9488'
+AMBER = '#f59e0b'
+DONUT_COLORS = ['#0f766e', '#0d9488', '#14b8a6', '#2dd4bf', '#5eead4']
+SUBPLOT_PARAMS = ('left', 'bottom', 'right', 'top', 'wspace', 'hspace')
+
+# Once per process, before any figure exists: figures read rcParams when they
+# are created and drawn, and nothing below changes them again.
+matplotlib.style.use(STYLE)
+
+
+def _new_figure(figsize, ncols):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    fig.subplots(1, ncols)
+    return fig
+
+
+class _Templates(threading.local):
+    """One trend and one breakdown figure per thread, built on first use."""
+
+    def __init__(self):
+        self.trend = _new_figure(TREND_SIZE, 1)
+        self.breakdown = _new_figure(BREAKDOWN_SIZE, 2)
+
+
+_templates = _Templates()
+
+
+def _reset(fig):
+    """Clear a template figure back to its freshly-built state."""
+    for ax in fig.axes:
+        ax.clear()
+    # tight_layout starts from the current subplot parameters, so undo the
+    # previous render's layout or the output drifts from render to render
+    fig.subplots_adjust(**{k: matplotlib.rcParams[f'figure.subplot.{k}'] for k in SUBPLOT_PARAMS})
+    return fig.axes
+
+
+def _hide_spines(ax):
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+
+def _png(fig):
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+    buffer.seek(0)
+    return buffer
+
+
+def trend_chart(flowrate, pressure):
+    """PNG (BytesIO) of the flowrate/pressure trend; each argument is an ``(x, y)`` pair."""
+    fig = _templates.trend
+    ax, = _reset(fig)
+    flow_x, flow_y = flowrate
+    press_x, press_y = pressure
+    ax.plot(flow_x, flow_y, label='Flowrate', color=TEAL, linewidth=1.5, alpha=0.9)
+    ax.fill_between(flow_x, flow_y, color=TEAL, alpha=0.1)
+    ax.plot(press_x, press_y, label='Pressure', color=AMBER, linestyle='--', linewidth=1.5)
+
+    ax.set_title('Process Trends Overview', fontsize=12, pad=10, fontweight='bold', color='#333333')
+    ax.legend(frameon=True, fontsize=9)
+    ax.set_ylabel('Value', fontsize=9)
+    ax.tick_params(axis='both', which='major', labelsize=8)
+    ax.margins(x=0)
+    _hide_spines(ax)
+    return _png(fig)
+
+
+def breakdown_chart(type_counts, type_flowrate):
+    """PNG (BytesIO) of the equipment donut next to the average-flowrate bars.
+
+    ``type_counts`` and ``type_flowrate`` are pandas Series indexed by type.
+    """
+    fig = _templates.breakdown
+    ax1, ax2 = _reset(fig)
+
+    ax1.pie(type_counts, labels=type_counts.index, autopct='%1.1f%%',
+            colors=DONUT_COLORS[:len(type_counts)], textprops={'fontsize': 8},
+            startangle=90, pctdistance=0.85)
+    ax1.add_artist(Circle((0, 0), 0.70, fc='white'))
+    ax1.set_title('Equipment Distribution', fontsize=10, fontweight='bold')
+
+    ax2.bar(type_flowrate.index, type_flowrate.values, color=TEAL, alpha=0.8, width=0.6)
+    ax2.set_title('Avg Flowrate by Type', fontsize=10, fontweight='bold')
+    ax2.tick_params(axis='x', rotation=45, labelsize=8)
+    ax2.grid(axis='y', linestyle='--', alpha=0.5)
+    _hide_spines(ax2)
+    return _png(fig)
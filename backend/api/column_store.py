@@ -0,0 +1,97 @@
+"""Per-dataset columnar copy of the records, memory-mapped by the analytics.
+
+Ingest writes each dataset's analytic columns under
+``MEDIA_ROOT/datasets/columns/<dataset id>/``, one file per column::
+
+    equipment_type.i4  flowrate.f8  pressure.f8  temperature.f8
+
+Each file is a bare little-endian array in record (id) order, so its length is
+the file size over the item size. ``equipment_type`` holds EquipmentType ids.
+Readers map only the columns they need with ``numpy.memmap`` and never query
+the database. A store is written to a temporary directory and renamed into
+place once ingestion succeeded, so a store that exists is always complete.
+"""
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+COLUMNS = {
+    'equipment_type': np.dtype('<i4'),
+    'flowrate': np.dtype('<f8'),
+    'pressure': np.dtype('<f8'),
+    'temperature': np.dtype('<f8'),
+}
+
+
+def store_root():
+    return Path(settings.MEDIA_ROOT) / 'datasets' / 'columns'
+
+
+def store_dir(dataset_id):
+    return store_root() / str(dataset_id)
+
+
+def _column_file(directory, name):
+    return directory / f'{name}.{COLUMNS[name].kind}{COLUMNS[name].itemsize}'
+
+
+class ColumnStoreWriter:
+    """Append record chunks to a dataset's store; ``commit()`` publishes it.
+
+    Chunks are DataFrames (or mappings) holding every column in ``COLUMNS``.
+    """
+
+    def __init__(self, dataset_id):
+        self.path = store_dir(dataset_id)
+        self.tmp = self.path.with_name(f'{dataset_id}.tmp')
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        self.tmp.mkdir(parents=True)
+        self.files = {name: open(_column_file(self.tmp, name), 'wb') for name in COLUMNS}
+
+    def append(self, chunk):
+        for name, f in self.files.items():
+            f.write(np.ascontiguousarray(chunk[name], dtype=COLUMNS[name]).tobytes())
+
+    def _close(self):
+        for f in self.files.values():
+            f.close()
+
+    def commit(self):
+        self._close()
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self._close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def read_column(dataset_id, name):
+    """A column of the dataset's store as a read-only array (memory-mapped),
+    or None if the dataset has no store."""
+    path = _column_file(store_dir(dataset_id), name)
+    try:
+        if path.stat().st_size == 0:
+            return np.empty(0, dtype=COLUMNS[name])  # mmap cannot map empty files
+    except FileNotFoundError:
+        return None
+    return np.memmap(path, dtype=COLUMNS[name], mode='r')
+
+
+def has_store(dataset_id):
+    return store_dir(dataset_id).is_dir()
+
+
+def move_store(dataset_id, to_dataset_id):
+    """Re-key a store when another dataset takes over the records."""
+    if has_store(dataset_id):
+        shutil.rmtree(store_dir(to_dataset_id), ignore_errors=True)
+        os.replace(store_dir(dataset_id), store_dir(to_dataset_id))
+
+
+def remove_store(dataset_id):
+    shutil.rmtree(store_dir(dataset_id), ignore_errors=True)
+    shutil.rmtree(store_dir(dataset_id).with_name(f'{dataset_id}.tmp'), ignore_errors=True)  # interrupted ingest
@@ -0,0 +1,73 @@
+"""Correlation matrices and least-squares fits between the metric columns."""
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+
+from .analytics import column_frame
+from .models import DatasetSummary
+from .summary import METRICS
+
+
+def _json_float(value):
+    return float(value) if np.isfinite(value) else None  # undefined for constant columns
+
+
+def _correlation(cov):
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = cov / np.outer(std, std)
+    return r
+
+
+def pair_statistics(values):
+    """Pearson and Spearman matrices and every pairwise linear fit of the
+    columns of ``values`` (rows x ``METRICS``), from one covariance matrix each.
+
+    Spearman is Pearson on average ranks, so ties are handled as usual.
+    ``fits`` has one entry per ordered pair: ``y = slope * x + intercept``.
+    """
+    n = len(values)
+    if n == 0:
+        return {'count': 0, 'pearson': None, 'spearman': None, 'fits': []}
+    mean = values.mean(axis=0)
+    cov = np.atleast_2d(np.cov(values, rowvar=False, ddof=0))
+    pearson = _correlation(cov)
+    ranks = pd.DataFrame(values).rank().to_numpy()
+    spearman = _correlation(np.atleast_2d(np.cov(ranks, rowvar=False, ddof=0)))
+
+    fits = []
+    for i, j in permutations(range(len(METRICS)), 2):
+        slope = cov[i, j] / cov[i, i] if cov[i, i] > 0 else np.nan
+        fits.append({
+            'x': METRICS[i],
+            'y': METRICS[j],
+            'slope': _json_float(slope),
+            'intercept': _json_float(mean[j] - slope * mean[i]),
+            'r2': _json_float(pearson[i, j] ** 2),
+        })
+    return {
+        'count': n,
+        'pearson': [[_json_float(v) for v in row] for row in pearson],
+        'spearman': [[_json_float(v) for v in row] for row in spearman],
+        'fits': fits,
+    }
+
+
+def compute_correlation(dataset_id):
+    """Pair statistics of the whole dataset and of each equipment type."""
+    frame = column_frame(dataset_id, METRICS + ['equipment_type'])
+    by_type = {
+        str(name): pair_statistics(group[METRICS].to_numpy())
+        for name, group in frame.groupby('equipment_type', observed=True, sort=True)
+    }
+    return dict(pair_statistics(frame[METRICS].to_numpy()), by_type=by_type)
+
+
+def get_correlation(summary):
+    """Correlation of a dataset, computed on first use and cached on its
+    DatasetSummary (cleared whenever the summary is rebuilt)."""
+    if summary.correlation is None:
+        summary.correlation = compute_correlation(summary.dataset_id)
+        DatasetSummary.objects.filter(pk=summary.pk).update(correlation=summary.correlation)
+    return summary.correlation
@@ -0,0 +1,109 @@
+"""Dataset deletion in bounded chunks, for datasets of millions of records.
+
+Shared by ``DELETE /api/datasets/<id>/`` (run as a ``delete`` job on the
+cleanup thread) and the retention sweeper (which runs its ``delete`` jobs
+inline).
+"""
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .column_store import remove_store
+from .models import Dataset, EquipmentRecord, Job
+from .report_cache import invalidate_reports
+
+CHUNK_PAUSE = 0.02  # seconds between chunks, so writers waiting on the lock get in
+
+
+def claim_for_deletion(dataset, user):
+    """Mark ``dataset`` as being deleted and create the ``delete`` Job that is to
+    purge it, together; None if it is pending or already claimed.
+
+    A deleting dataset drops out of listings, answers 409 like any dataset that
+    is not ready and is never picked as the original of a duplicate upload. It
+    always has a delete job, so one whose job died can be told apart and given
+    back (see :mod:`api.recovery`).
+    """
+    with transaction.atomic():
+        claimed = (Dataset.objects.filter(pk=dataset.pk)
+                   .exclude(status__in=[Dataset.STATUS_PENDING, Dataset.STATUS_DELETING])
+                   .update(status=Dataset.STATUS_DELETING))
+        return Job.objects.create(user=user, dataset=dataset, kind=Job.KIND_DELETE) if claimed else None
+
+
+def delete_records(dataset_id, chunk_rows=None):
+    """Delete a dataset's records ``chunk_rows`` at a time, in id order.
+
+    A generator yielding the running number of rows deleted after each chunk
+    has committed. Every chunk is one raw ``DELETE ... WHERE dataset_id = %s AND
+    id <= <chunk's last id>`` in its own short transaction, served by the
+    (dataset, id) index: the ORM's cascade collector is bypassed and the
+    database write lock is only ever held for one chunk.
+    """
+    chunk_rows = chunk_rows or settings.DELETE_CHUNK_ROWS
+    table = connection.ops.quote_name(EquipmentRecord._meta.db_table)
+    deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {table} WHERE dataset_id = %s ORDER BY id LIMIT 1 OFFSET %s",
+                           [dataset_id, chunk_rows - 1])
+            last = cursor.fetchone()
+            if last is None:  # fewer than chunk_rows left
+                cursor.execute(f"DELETE FROM {table} WHERE dataset_id = %s", [dataset_id])
+            else:
+                cursor.execute(f"DELETE FROM {table} WHERE dataset_id = %s AND id <= %s", [dataset_id, last[0]])
+            deleted += cursor.rowcount
+        yield deleted
+        if last is None:
+            return
+        time.sleep(CHUNK_PAUSE)
+
+
+def purge_dataset(dataset, progress=None):
+    """Delete a claimed ``dataset`` with its records, summary, column store,
+    cached reports and file; returns the number of records deleted.
+
+    ``progress`` is called with the running count after each chunk. A dataset
+    with duplicates hands its records to the oldest one instead (see
+    ``Dataset.delete``).
+    """
+    dataset_id = dataset.id  # delete() clears it
+    deleted = 0
+    if not dataset.aliases.exists():
+        for deleted in delete_records(dataset_id):
+            if progress:
+                progress(deleted)
+    dataset.delete()
+    remove_store(dataset_id)
+    invalidate_reports(dataset_id)
+    if dataset.file:
+        dataset.file.delete(save=False)
+    return deleted
+
+
+def run_deletion(job):
+    """Purge the dataset of a ``delete`` job from ``claim_for_deletion``, recording
+    progress and outcome on the job; returns whether the dataset was removed.
+
+    A job no longer pending is left alone: recovery gave it up for dead and the
+    dataset is ``failed`` again, to be deleted anew.
+    """
+    if not Job.objects.filter(pk=job.pk, status=Job.STATUS_PENDING) \
+            .update(status=Job.STATUS_RUNNING, started_at=timezone.now()):
+        return False
+    running = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING)
+    dataset = job.dataset
+    if dataset is None:
+        running.update(status=Job.STATUS_FAILED, error="Dataset was removed", finished_at=timezone.now())
+        return False
+    try:
+        rows = purge_dataset(dataset, progress=lambda rows: running.update(rows_processed=rows))
+    except Exception as e:
+        # Partly deleted: no longer ready, but can be deleted again
+        Dataset.objects.filter(pk=dataset.pk).update(status=Dataset.STATUS_FAILED)
+        running.update(status=Job.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+        return False
+    running.update(status=Job.STATUS_DONE, rows_processed=rows, finished_at=timezone.now())
+    return True
@@ -0,0 +1,67 @@
+"""Histograms and 2D grid densities of the metric columns, so charts of large
+datasets get a payload that depends on the bin count rather than the rows."""
+import numpy as np
+
+from .analytics import metric_column
+from .models import DatasetSummary
+
+DEFAULT_BINS = 40
+MAX_BINS = 200
+CACHED_HISTOGRAMS = 16  # per dataset; the oldest is dropped beyond that
+
+
+def _bin_index(summary, metric, bins):
+    """Edges of ``bins`` equal-width bins over the metric's min..max and the bin
+    of every value, the last bin closed as in ``numpy.histogram``."""
+    low, high = summary.metrics[metric]['min'], summary.metrics[metric]['max']
+    if high <= low:  # constant column: centre it in the range, like numpy
+        low, high = low - 0.5, high + 0.5
+    values = metric_column(summary.dataset_id, metric)
+    edges = np.linspace(low, high, bins + 1)
+    index = ((values - low) * (bins / (high - low))).astype(np.intp)
+    np.minimum(index, bins - 1, out=index)
+    # The scaled value can round across an edge: check against the edges, as numpy does
+    index -= values < edges[index]
+    index += (values >= edges[index + 1]) & (index != bins - 1)
+    return edges, index
+
+
+def compute_histogram(summary, x, x_bins, y=None, y_bins=None):
+    """Histogram of metric ``x``; with ``y``, also the ``x_bins`` x ``y_bins``
+    grid of counts, from one ``bincount`` over the combined bin index. The
+    marginal histograms are the grid's row and column sums."""
+    x_edges, index = _bin_index(summary, x, x_bins)
+    result = {'x': x, 'x_edges': x_edges.tolist()}
+    if y is None:
+        result['x_counts'] = np.bincount(index, minlength=x_bins).tolist()
+        return result
+    y_edges, y_index = _bin_index(summary, y, y_bins)
+    index *= y_bins
+    index += y_index
+    counts = np.bincount(index, minlength=x_bins * y_bins).reshape(x_bins, y_bins)
+    result.update({
+        'x_counts': counts.sum(axis=1).tolist(),
+        'y': y,
+        'y_edges': y_edges.tolist(),
+        'y_counts': counts.sum(axis=0).tolist(),
+        'counts': counts.tolist(),
+    })
+    return result
+
+
+def get_histogram(summary, x, x_bins, y=None, y_bins=None):
+    """``compute_histogram`` cached on the DatasetSummary per metric and bin
+    count (cleared whenever the summary is rebuilt).
+
+    Entries carry an insertion number and the lowest numbers are evicted:
+    key order is no guide, PostgreSQL's jsonb does not keep it.
+    """
+    key = f'{x}:{x_bins}' if y is None else f'{x}:{x_bins},{y}:{y_bins}'
+    entry = summary.histograms.get(key)
+    if entry is None or 'seq' not in entry:  # also entries cached before they were numbered
+        entry = {'seq': 1 + max((e.get('seq', 0) for e in summary.histograms.values()), default=0),
+                 'histogram': compute_histogram(summary, x, x_bins, y, y_bins)}
+        newest = sorted(summary.histograms.items(), key=lambda item: item[1].get('seq', 0))
+        summary.histograms = dict(newest[-(CACHED_HISTOGRAMS - 1):], **{key: entry})
+        DatasetSummary.objects.filter(pk=summary.pk).update(histograms=summary.histograms)
+    return entry['histogram']
@@ -0,0 +1,112 @@
+from itertools import repeat
+
+from django.conf import settings
+from django.db import connection, transaction
+
+import pandas as pd
+
+from .column_store import ColumnStoreWriter
+from .deletion import delete_records
+from .models import EquipmentRecord, EquipmentType
+from .summary import SummaryAccumulator, save_summary
+
+# CSV header -> EquipmentRecord column
+CSV_COLUMNS = {
+    'Equipment Name': 'equipment_name',
+    'Type': 'equipment_type',
+    'Flowrate': 'flowrate',
+    'Pressure': 'pressure',
+    'Temperature': 'temperature',
+}
+CSV_DTYPES = {
+    'Equipment Name': 'str',
+    'Type': 'str',
+    'Flowrate': 'float64',
+    'Pressure': 'float64',
+    'Temperature': 'float64',
+}
+INSERT_FIELDS = list(CSV_COLUMNS.values())  # inserted after dataset_id
+
+
+def validate_header(path):
+    """Fail fast (before queueing a job) if required CSV columns are missing."""
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [c for c in CSV_COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def read_chunks(path, chunk_rows=None):
+    """Yield the CSV as bounded DataFrames with model column names."""
+    chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+    reader = pd.read_csv(path, usecols=list(CSV_COLUMNS), dtype=CSV_DTYPES, chunksize=chunk_rows)
+    row_offset = 0
+    for chunk in reader:
+        chunk = chunk.rename(columns=CSV_COLUMNS)
+        missing = chunk.isna().any(axis=1)
+        if missing.any():
+            bad_row = row_offset + int(missing.to_numpy().argmax()) + 2  # 1-based + header line
+            raise ValueError(f"Missing value on line {bad_row}")
+        row_offset += len(chunk)
+        yield chunk
+
+
+def _insert_sql():
+    qn = connection.ops.quote_name
+    meta = EquipmentRecord._meta
+    columns = ['dataset_id'] + [meta.get_field(f).column for f in INSERT_FIELDS]
+    placeholders = ', '.join(['%s'] * len(columns))
+    table = qn(meta.db_table)
+    columns = ', '.join(qn(c) for c in columns)
+    return f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+
+
+def insert_chunk(cursor, dataset_id, chunk, batch_rows=None):
+    """Insert a chunk column-wise: the rows are zipped from plain column lists,
+    no model instances or per-row DataFrame access involved. The chunk's
+    ``equipment_type`` column must already hold EquipmentType ids."""
+    batch_rows = batch_rows or settings.INGEST_BATCH_ROWS
+    sql = _insert_sql()
+    columns = [chunk[c].tolist() for c in INSERT_FIELDS]
+    for start in range(0, len(chunk), batch_rows):
+        stop = start + batch_rows
+        rows = zip(repeat(dataset_id), *(col[start:stop] for col in columns))
+        cursor.executemany(sql, list(rows))
+
+
+def ingest_csv(dataset, chunk_rows=None, batch_rows=None, progress=None):
+    """Parse ``dataset.file`` in chunks, bulk insert its records and store the
+    dataset's summary statistics and column store, built from the same chunks.
+
+    Every chunk is committed on its own so progress is visible to other
+    connections and no transaction grows with the file; if any chunk fails,
+    the rows already inserted for the dataset are removed before re-raising.
+    ``progress`` is called with the running row count after every chunk.
+    Returns the number of rows inserted.
+    """
+    total = 0
+    summary = SummaryAccumulator()
+    columns = ColumnStoreWriter(dataset.id)
+    type_ids = {}
+    try:
+        for chunk in read_chunks(dataset.file.path, chunk_rows):
+            names = chunk['equipment_type']
+            new_names = set(names.unique()) - type_ids.keys()
+            if new_names:
+                type_ids.update(EquipmentType.ids_for(new_names))
+            coded = chunk.assign(equipment_type=names.map(type_ids))
+            with transaction.atomic(), connection.cursor() as cursor:
+                insert_chunk(cursor, dataset.id, coded, batch_rows)
+            columns.append(coded)
+            summary.update(chunk)
+            total += len(chunk)
+            if progress:
+                progress(total)
+        save_summary(dataset.id, summary)
+    except Exception:
+        columns.abort()
+        for _ in delete_records(dataset.id):  # chunked, like any large delete
+            pass
+        raise
+    columns.commit()
+    return total
@@ -0,0 +1,264 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Dataset, Job
+from .ingest import ingest_csv
+from .reports import get_or_render_report
+from .deletion import run_deletion
+from .recovery import ACTIVE, fail_stale_jobs, live_jobs
+from .retention import sweep
+
+_ingest_pool = None
+_report_pool = None
+_cleanup_pool = None
+_sweep_queued = False
+_pool_lock = threading.Lock()
+
+
+def ingest_pool():
+    """Process-wide thread pool for CSV ingestion (created on first use)."""
+    global _ingest_pool
+    with _pool_lock:
+        if _ingest_pool is None:
+            _ingest_pool = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS,
+                                              thread_name_prefix='ingest')
+        return _ingest_pool
+
+
+def report_pool():
+    """Process-wide pool of REPORT_WORKERS render processes (created on first use).
+
+    Processes are spawned rather than forked so they never share the parent's
+    database connections; the pool size is the hard cap on concurrent renders.
+    A spawned interpreter inherits DJANGO_SETTINGS_MODULE but needs setting up,
+    and before anything from ``api`` is unpickled into it: the initializer is
+    ``django.setup`` itself, not a function of this module (importing it would
+    load the models first).
+    """
+    global _report_pool
+    with _pool_lock:
+        if _report_pool is None:
+            _report_pool = ProcessPoolExecutor(max_workers=settings.REPORT_WORKERS,
+                                               mp_context=multiprocessing.get_context('spawn'),
+                                               initializer=django.setup)
+        return _report_pool
+
+
+def _discard_report_pool(pool):
+    """Shut down a broken render pool (one of its processes died) so that the
+    next ``report_pool()`` call starts a fresh one."""
+    global _report_pool
+    with _pool_lock:
+        if _report_pool is pool:
+            _report_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_render(fn, *args):
+    """``report_pool().submit(fn, *args)``, replacing the pool if it is broken.
+
+    A render process killed mid-render (out of memory, a crash) breaks the
+    whole executor: its queued futures fail and every later ``submit`` would
+    raise ``BrokenProcessPool``. The broken pool is discarded as soon as one of
+    its futures reports it, and at the latest by the next submit.
+    """
+    pool = report_pool()
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard_report_pool(pool)
+        pool = report_pool()
+        future = pool.submit(fn, *args)
+    future.add_done_callback(lambda f: _discard_if_broken(pool, f))
+    return future
+
+
+def _discard_if_broken(pool, future):
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_report_pool(pool)
+
+
+def cleanup_pool():
+    """Single background thread for dataset deletions and retention sweeps.
+
+    One thread, so purges queue up behind each other instead of competing
+    for the database write lock.
+    """
+    global _cleanup_pool
+    with _pool_lock:
+        if _cleanup_pool is None:
+            _cleanup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cleanup')
+        return _cleanup_pool
+
+
+def schedule_sweep():
+    """Run a retention sweep on the cleanup thread.
+
+    Requests coalesce: while a sweep is queued and not yet started, further
+    calls add nothing (the queued sweep will see their datasets too).
+    """
+    global _sweep_queued
+    if not settings.RETENTION_SWEEP_ON_UPLOAD:
+        return
+    with _pool_lock:
+        if _sweep_queued:
+            return
+        _sweep_queued = True
+    cleanup_pool().submit(run_sweep)
+
+
+def run_sweep():
+    global _sweep_queued
+    with _pool_lock:
+        _sweep_queued = False
+    close_old_connections()
+    try:
+        sweep()
+    finally:
+        connection.close()
+
+
+def _start(job_id):
+    Job.objects.filter(pk=job_id).update(status=Job.STATUS_RUNNING, started_at=timezone.now())
+
+
+def _finish(job_id, **fields):
+    Job.objects.filter(pk=job_id).update(status=Job.STATUS_DONE, finished_at=timezone.now(), **fields)
+
+
+def _fail(job_id, error):
+    Job.objects.filter(pk=job_id).update(status=Job.STATUS_FAILED, error=error, finished_at=timezone.now())
+
+
+def submit_ingest(dataset):
+    """Create an ingest Job for ``dataset`` and queue it on the worker pool."""
+    job = Job.objects.create(user=dataset.user, dataset=dataset, kind=Job.KIND_INGEST)
+    transaction.on_commit(lambda: ingest_pool().submit(run_ingest_job, job.id))
+    return job
+
+
+def run_ingest_job(job_id):
+    close_old_connections()
+    try:
+        job = Job.objects.select_related('dataset').get(pk=job_id)
+        dataset = job.dataset
+        if dataset is None:
+            _fail(job_id, "Dataset was removed")
+            return
+        _start(job_id)
+
+        def progress(rows):
+            Job.objects.filter(pk=job_id).update(rows_processed=rows)
+
+        try:
+            rows = ingest_csv(dataset, progress=progress)
+        except Exception as e:
+            Dataset.objects.filter(pk=dataset.pk).update(status=Dataset.STATUS_FAILED)
+            _fail(job_id, str(e))
+            return
+
+        # Not if recovery gave the job up for dead meanwhile (see api.recovery)
+        Dataset.objects.filter(pk=dataset.pk, status=Dataset.STATUS_PENDING).update(status=Dataset.STATUS_READY)
+        _finish(job_id, rows_processed=rows)
+    finally:
+        connection.close()
+        # Older uploads are only purged once this one is no longer pending
+        schedule_sweep()
+
+
+def submit_delete(job):
+    """Queue a ``delete`` Job from ``claim_for_deletion`` on the cleanup thread."""
+    transaction.on_commit(lambda: cleanup_pool().submit(run_delete_job, job.id))
+    return job
+
+
+def run_delete_job(job_id):
+    close_old_connections()
+    try:
+        run_deletion(Job.objects.select_related('dataset').get(pk=job_id))
+    finally:
+        connection.close()
+
+
+def active_report_jobs():
+    """Queued or running renders, first failing those past REPORT_JOB_TIMEOUT
+    (their render process went away, see api.recovery)."""
+    fail_stale_jobs(Job.KIND_REPORT)
+    return live_jobs(Job.KIND_REPORT)
+
+
+def submit_report(dataset, user):
+    """Queue a PDF render of ``dataset`` on the render pool and return its Job.
+
+    An already queued or running render of the same dataset is reused.
+    """
+    job = active_report_jobs().filter(dataset=dataset, user=user).first()
+    if job:
+        return job
+    job = Job.objects.create(user=user, dataset=dataset, kind=Job.KIND_REPORT)
+
+    transaction.on_commit(lambda: queue_report(job))
+    return job
+
+
+def queue_report(job):
+    """Run report ``job`` on the render pool; returns its future."""
+    future = submit_render(run_report_job, job.id)
+    future.add_done_callback(lambda f: _report_crashed(job.id, f))
+    return future
+
+
+def _report_crashed(job_id, future):
+    # The render never ran to the end: cancelled while queued, or its process
+    # died (taking the pool with it) before it could record the failure itself
+    error = "Cancelled" if future.cancelled() else future.exception()
+    if error is not None:
+        try:
+            Job.objects.filter(pk=job_id, status__in=ACTIVE).update(status=Job.STATUS_FAILED, error=str(error),
+                                                                    finished_at=timezone.now())
+        finally:
+            connection.close()
+
+
+def run_report_job(job_id):
+    """Render (or reuse) the cached report for a Job; runs in a render process."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        if job.dataset_id is None:
+            _fail(job_id, "Dataset was removed")
+            return
+        _start(job_id)
+        try:
+            get_or_render_report(job.dataset_id)
+        except Exception as e:
+            _fail(job_id, str(e))
+            return
+        _finish(job_id)
+    finally:
+        connection.close()
+
+
+def report_error(job, future):
+    """Why a finished report job failed, or None if its report is rendered."""
+    error = "Cancelled" if future.cancelled() else future.exception()
+    if error is not None:
+        return str(error)
+    job.refresh_from_db()
+    return job.error if job.status != Job.STATUS_DONE else None
+
+
+def render_report_bounded(dataset, user):
+    """Render a report synchronously, as a report Job on the render pool so it
+    counts towards REPORT_QUEUE_LIMIT; returns the error if it failed."""
+    job = Job.objects.create(user=user, dataset=dataset, kind=Job.KIND_REPORT)
+    future = queue_report(job)
+    future.exception()  # wait
+    return report_error(job, future)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.analytics import build_store
+from api.column_store import has_store
+from api.models import Dataset
+
+
+class Command(BaseCommand):
+    help = "Write the column store of ready datasets ingested before column stores existed."
+
+    def handle(self, *args, **options):
+        built = 0
+        # Duplicates read their original's store
+        for dataset_id in (Dataset.objects.filter(status=Dataset.STATUS_READY, source__isnull=True)
+                           .order_by('id').values_list('id', flat=True)):
+            if not has_store(dataset_id):
+                build_store(dataset_id)
+                built += 1
+                self.stdout.write(f"Built column store of dataset {dataset_id}")
+        self.stdout.write(self.style.SUCCESS(f"Built {built} column store(s)."))
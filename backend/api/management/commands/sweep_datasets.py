@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.retention import expired_datasets, sweep
+
+
+class Command(BaseCommand):
+    help = "Purge datasets beyond each user's DATASET_RETENTION newest, records in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="List the datasets that would be purged without deleting anything.")
+
+    def handle(self, *args, dry_run=False, **options):
+        if dry_run:
+            for dataset in expired_datasets():
+                self.stdout.write(f"{dataset.id}\t{dataset.user_id}\t{dataset.uploaded_at:%Y-%m-%d %H:%M}\t{dataset.file.name}")
+            return
+        purged = sweep()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {purged} dataset(s) (keeping {settings.DATASET_RETENTION} per user)."))
@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_equipment_types(apps, schema_editor):
+    # One INSERT per distinct name and one UPDATE per type, not per record
+    EquipmentType = apps.get_model('api', 'EquipmentType')
+    EquipmentRecord = apps.get_model('api', 'EquipmentRecord')
+    names = EquipmentRecord.objects.order_by().values_list('equipment_type', flat=True).distinct()
+    for name in list(names):
+        equipment_type, _ = EquipmentType.objects.get_or_create(name=name)
+        EquipmentRecord.objects.filter(equipment_type=name).update(equipment_type_ref=equipment_type)
+
+
+def restore_equipment_type_names(apps, schema_editor):
+    EquipmentType = apps.get_model('api', 'EquipmentType')
+    EquipmentRecord = apps.get_model('api', 'EquipmentRecord')
+    for equipment_type in EquipmentType.objects.all():
+        EquipmentRecord.objects.filter(equipment_type_ref=equipment_type).update(equipment_type=equipment_type.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_dataset_content_hash'),
+    ]
+
+    operations = [
+        # Nullable until dropped in 0007, so that migrating back can re-add the
+        # column empty and refill it from the type table
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='equipment_type',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='EquipmentType',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='equipmentrecord',
+            name='equipment_type_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.equipmenttype'),
+        ),
+        migrations.RunPython(fill_equipment_types, restore_equipment_type_names),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0006 so the schema changes do not share a transaction with
+    # the row updates (PostgreSQL refuses ALTER TABLE with pending FK checks)
+
+    dependencies = [
+        ('api', '0006_equipmenttype'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='equipmentrecord',
+            name='equipment_type',
+        ),
+        migrations.RenameField(
+            model_name='equipmentrecord',
+            old_name='equipment_type_ref',
+            new_name='equipment_type',
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='equipment_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='records', to='api.equipmenttype'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_equipmentrecord_equipment_type_fk'),
+    ]
+
+    # New indexes first, so dataset lookups are never without one; the plain
+    # dataset_id index the FK used to create is then redundant with (dataset, id)
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'id'], name='record_dataset_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'equipment_type', 'flowrate', 'pressure', 'temperature'], name='record_dataset_type_idx'),
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='api.dataset'),
+        ),
+    ]
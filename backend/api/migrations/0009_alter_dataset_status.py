@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_equipmentrecord_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed'), ('deleting', 'Deleting')], default='ready', max_length=16),
+        ),
+    ]
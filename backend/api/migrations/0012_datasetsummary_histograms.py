@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_datasetsummary_correlation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetsummary',
+            name='histograms',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
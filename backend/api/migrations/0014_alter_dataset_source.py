@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_datasetsummary_sketches'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='source',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='aliases', to='api.dataset'),
+        ),
+    ]
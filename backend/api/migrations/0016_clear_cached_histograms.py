@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_histograms(apps, schema_editor):
+    # Cached before values on a bin edge were binned like numpy: recomputed on next request
+    DatasetSummary = apps.get_model('api', 'DatasetSummary')
+    DatasetSummary.objects.update(histograms={})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_narrow_record_dataset_type_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_histograms, migrations.RunPython.noop),
+    ]
@@ -1,30 +1,158 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 import os
 
 from django.contrib.auth.models import User
 
+from .column_store import move_store
+
 class Dataset(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_DELETING = 'deleting'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_DELETING, 'Deleting'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, default=1)
     file = models.FileField(upload_to='datasets/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Keep only last 5
-        # Keep only last 5 FOR THIS USER
-        # Note: 'self.user' might be not set if not handled in view correctly yet, but default=1 helps.
-        if self.user:
-            ids_to_keep = list(Dataset.objects.filter(user=self.user).order_by('-uploaded_at')[:5].values_list('id', flat=True))
-            if Dataset.objects.filter(user=self.user).count() > 5:
-                 to_delete = Dataset.objects.filter(user=self.user).exclude(id__in=ids_to_keep)
-                 for ds in to_delete:
-                     ds.file.delete()
-                     ds.delete()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_READY)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 of the uploaded file
+    # Set on re-uploads of an identical file: records and summary are read from the source.
+    # RESTRICT: a source is only deleted through delete() below, which hands its data
+    # over first, or together with all its aliases (its user's cascade).
+    source = models.ForeignKey('self', null=True, blank=True, on_delete=models.RESTRICT, related_name='aliases')
+
+    @property
+    def data_id(self):
+        """Id of the dataset whose records and summary this dataset uses."""
+        return self.source_id or self.id
+
+    def delete(self, *args, **kwargs):
+        # Hand records and summary over to the oldest duplicate before they cascade away
+        heir = self.aliases.order_by('id').first()
+        if heir is not None:
+            with transaction.atomic():
+                EquipmentRecord.objects.filter(dataset_id=self.id).update(dataset_id=heir.id)
+                DatasetSummary.objects.filter(dataset_id=self.id).update(dataset_id=heir.id)
+                self.aliases.exclude(id=heir.id).update(source=heir)
+                Dataset.objects.filter(id=heir.id).update(source=None)
+            move_store(self.id, heir.id)
+        return super().delete(*args, **kwargs)
+
+def resolve_data_id(dataset_id):
+    """``Dataset.data_id`` for a dataset id, without loading the dataset."""
+    source_id = Dataset.objects.filter(id=dataset_id).values_list('source_id', flat=True).first()
+    return source_id or dataset_id
+
+class EquipmentType(models.Model):
+    """Equipment type names ('Type' in CSV), stored once and referenced by id."""
+    name = models.CharField(max_length=100, unique=True)
+
+    @classmethod
+    def names(cls):
+        """``{id: name}`` of every type (a handful of rows)."""
+        return dict(cls.objects.values_list('id', 'name'))
+
+    @classmethod
+    def ids_for(cls, names):
+        """``{name: id}`` for ``names``, creating the types not seen before."""
+        names = set(names)
+        ids = dict(cls.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = names - ids.keys()
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(cls.objects.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
+class EquipmentRecordQuerySet(models.QuerySet):
+    def rows(self, fields, chunk_size):
+        """Iterate ``values_list(*fields)`` tuples with ``equipment_type`` as its
+        name. Types are looked up in one small dict rather than joined per row."""
+        rows = self.values_list(*fields).iterator(chunk_size=chunk_size)
+        if 'equipment_type' not in fields:
+            return rows
+        i = list(fields).index('equipment_type')
+        names = EquipmentType.names()
+        return (row[:i] + (names[row[i]],) + row[i + 1:] for row in rows)
+
 
 class EquipmentRecord(models.Model):
-    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='records')
+    # Indexed through Meta.indexes, whose (dataset, id) index also serves dataset-only lookups
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='records', db_index=False)
     equipment_name = models.CharField(max_length=255)
-    equipment_type = models.CharField(max_length=100) # 'Type' in CSV
+    # No index of its own: types are never deleted and reads filter on dataset first
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='records', db_index=False)
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
+
+    objects = EquipmentRecordQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Records pages, the PDF table and series: one dataset in id order
+            models.Index(fields=['dataset', 'id'], name='record_dataset_id_idx'),
+            # Per-type aggregates: grouped in index order. Not covering the metrics:
+            # that halved ingest throughput for a query only the legacy backfill runs
+            models.Index(fields=['dataset', 'equipment_type'], name='record_dataset_type_idx'),
+        ]
+
+
+class DatasetSummary(models.Model):
+    """Dataset statistics computed once at ingest time (one row per dataset)."""
+    dataset = models.OneToOneField(Dataset, on_delete=models.CASCADE, related_name='summary')
+    total_count = models.BigIntegerField()
+    metrics = models.JSONField()            # {"flowrate": {"mean", "min", "max", "std"}, ...}
+    type_distribution = models.JSONField()  # {"Pump": 12, ...}
+    type_means = models.JSONField()         # {"Pump": {"flowrate": ..., "pressure": ..., "temperature": ...}}
+    correlation = models.JSONField(null=True, blank=True)  # api.correlation, filled on first request
+    histograms = models.JSONField(default=dict, blank=True)  # api.histogram, keyed by metrics and bins
+    sketches = models.JSONField(null=True, blank=True)      # {"Pump": {"pressure": t-digest, ...}}, api.tdigest
+    computed_at = models.DateTimeField(auto_now=True)
+
+
+class Job(models.Model):
+    """Background work item (CSV ingestion, PDF render, deletion) polled via /api/jobs/<id>/."""
+    KIND_INGEST = 'ingest'
+    KIND_REPORT = 'report'
+    KIND_DELETE = 'delete'
+    KIND_CHOICES = [
+        (KIND_INGEST, 'Ingest'),
+        (KIND_REPORT, 'Report'),
+        (KIND_DELETE, 'Delete'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def throughput(self):
+        """Rows per second since the job started (None until it runs)."""
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else None
@@ -0,0 +1,21 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RecordCursorPagination(CursorPagination):
+    """Keyset pagination over EquipmentRecord.id.
+
+    Opt-in: only used when the request carries ``?limit=`` or ``?cursor=``, so
+    clients of small datasets still get the plain unpaginated list. Each page is
+    an ``id > <last id>`` range scan, so cost stays constant however deep the
+    client pages.
+    """
+    ordering = 'id'
+    page_size = 1000
+    page_size_query_param = 'limit'
+    max_page_size = 50000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,49 @@
+"""Approximate per-type metric quantiles from the t-digests in DatasetSummary."""
+from .analytics import column_frame
+from .models import DatasetSummary
+from .summary import METRICS
+from .tdigest import COMPRESSION, TDigest, rank_error
+
+QUANTILES = [0.5, 0.95, 0.99]
+MAX_QUANTILES = 10
+
+
+def quantile_key(q):
+    return f'p{q * 100:g}'  # 0.5 -> "p50", 0.999 -> "p99.9"
+
+
+def get_sketches(summary):
+    """``{type: {metric: TDigest}}`` of a dataset.
+
+    Built during ingestion; datasets summarized before sketches existed get
+    theirs from the column store (or the records) on first use.
+    """
+    if summary.sketches is None:
+        frame = column_frame(summary.dataset_id, METRICS + ['equipment_type'])
+        summary.sketches = {
+            str(name): {m: TDigest().add(group[m].to_numpy()).to_dict() for m in METRICS}
+            for name, group in frame.groupby('equipment_type', observed=True, sort=True)
+        }
+        DatasetSummary.objects.filter(pk=summary.pk).update(sketches=summary.sketches)
+    return {t: {m: TDigest.from_dict(d) for m, d in sketches.items()} for t, sketches in summary.sketches.items()}
+
+
+def merge_sketches(sketch_sets):
+    """Merge the ``get_sketches`` of several datasets type by type."""
+    types = sorted(set().union(*sketch_sets))
+    return {t: {m: TDigest.merged([s[t][m] for s in sketch_sets if t in s]) for m in METRICS}
+            for t in types}
+
+
+def quantile_table(sketches, qs=QUANTILES):
+    """``qs`` quantiles of every metric, overall and per type, with the rank
+    error bound of each quantile as a fraction of the rows."""
+    def describe(digest):
+        return dict(zip(map(quantile_key, qs), digest.quantiles(qs)))
+
+    return {
+        'compression': COMPRESSION,
+        'rank_error': {quantile_key(q): rank_error(q) for q in qs},
+        'metrics': {m: describe(TDigest.merged([s[m] for s in sketches.values()])) for m in METRICS},
+        'by_type': {t: {m: describe(s[m]) for m in METRICS} for t, s in sorted(sketches.items())},
+    }
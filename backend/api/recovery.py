@@ -0,0 +1,59 @@
+"""Recovery of background jobs whose worker went away.
+
+Jobs run on pools inside the server process, so a restart, a worker recycle or
+a crash leaves the jobs it held ``pending`` or ``running`` for good. A job
+older than its kind's timeout (counted from ``started_at``, or from
+``created_at`` while it is still queued) is taken for dead. Run at the start of
+every retention sweep (see :func:`api.retention.sweep`), and for renders
+whenever the render queue is looked at (:func:`api.jobs.active_report_jobs`).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Dataset, Job
+
+ACTIVE = [Job.STATUS_PENDING, Job.STATUS_RUNNING]
+INTERRUPTED = "Interrupted: the server stopped before the job finished"
+
+
+def _timeout(kind):
+    return {
+        Job.KIND_INGEST: settings.INGEST_JOB_TIMEOUT,
+        Job.KIND_REPORT: settings.REPORT_JOB_TIMEOUT,
+        Job.KIND_DELETE: settings.DELETE_JOB_TIMEOUT,
+    }[kind]
+
+
+def _stale(kind):
+    cutoff = timezone.now() - timedelta(seconds=_timeout(kind))
+    return Q(kind=kind, status__in=ACTIVE) & (
+        Q(started_at__lt=cutoff) | Q(started_at__isnull=True, created_at__lt=cutoff))
+
+
+def live_jobs(kind):
+    """Pending or running jobs of ``kind`` that are still within their timeout."""
+    return Job.objects.filter(kind=kind, status__in=ACTIVE).exclude(_stale(kind))
+
+
+def fail_stale_jobs(kind):
+    """Mark the dead jobs of ``kind`` failed; returns how many there were.
+
+    The dataset of a dead ingest becomes ``failed``: it stops holding a
+    retention slot and is swept with the rows it had already committed. So
+    does a ``deleting`` dataset without a live delete job, whatever rows its
+    purge had left: it can be deleted again and the sweep finishes the purge.
+    """
+    stale = Job.objects.filter(_stale(kind))
+    if kind == Job.KIND_INGEST:
+        Dataset.objects.filter(status=Dataset.STATUS_PENDING, id__in=stale.values('dataset_id')) \
+            .update(status=Dataset.STATUS_FAILED)
+    failed = stale.update(status=Job.STATUS_FAILED, error=INTERRUPTED, finished_at=timezone.now())
+    if kind == Job.KIND_DELETE:
+        # Not NOT IN over a NULL: that would match no dataset at all
+        deleting = live_jobs(kind).filter(dataset__isnull=False).values('dataset_id')
+        Dataset.objects.filter(status=Dataset.STATUS_DELETING).exclude(id__in=deleting) \
+            .update(status=Dataset.STATUS_FAILED)
+    return failed
@@ -0,0 +1,39 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON (``?format=ndjson`` or ``Accept: application/x-ndjson``).
+
+    Record endpoints stream their rows themselves when this renderer is
+    selected; ``render`` only handles ordinary payloads such as errors.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(json.dumps(row) + '\n' for row in rows).encode(self.charset)
+
+
+class ColumnarRenderer(BaseRenderer):
+    """Columnar binary records (``?format=columns`` or
+    ``Accept: application/vnd.chemviz.columns``), see ``api.columnar``.
+
+    Record endpoints encode their rows themselves when this renderer is
+    selected; ``render`` only handles ordinary payloads such as errors, which
+    are sent as JSON.
+    """
+    media_type = 'application/vnd.chemviz.columns'
+    format = 'columns'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data).encode('utf-8')
@@ -0,0 +1,126 @@
+"""Several datasets' reports as one ZIP archive, streamed while it is built."""
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .jobs import queue_report, report_error
+from .models import Job
+from .reports import report_filename
+from .report_cache import report_path
+
+ARCHIVE_CHUNK = 256 * 1024
+
+
+class _StreamBuffer:
+    """Write-only, unseekable file for ZipFile; collects output until drained.
+
+    ZipFile notices the missing ``seek``/``tell`` and writes each member's
+    sizes and CRC after its data, so nothing is ever rewritten in place.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def member_names(datasets):
+    """``{dataset id: file name in the archive}``, unique even for re-uploaded files."""
+    names, seen = {}, set()
+    for dataset in datasets:
+        name = report_filename(dataset)
+        if name in seen:
+            name = f"{name.rsplit('.', 1)[0]}_{dataset.id}.pdf"
+        seen.add(name)
+        names[dataset.id] = name
+    return names
+
+
+def _write_member(archive, buffer, name, path):
+    with open(path, 'rb') as src:
+        info = zipfile.ZipInfo(name, date_time=time.localtime(os.fstat(src.fileno()).st_mtime)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        # Sizes are only known afterwards, so always leave room for ZIP64 fields
+        with archive.open(info, 'w', force_zip64=True) as dest:
+            while chunk := src.read(ARCHIVE_CHUNK):
+                dest.write(chunk)
+                data = buffer.drain()
+                if data:
+                    yield data
+    yield buffer.drain()
+
+
+def stream_reports_zip(datasets, user, slots):
+    """Yield the bytes of a ZIP holding the report of every dataset in ``datasets``.
+
+    Cached reports are archived straight away while the missing ones render
+    as ``user``'s report jobs, at most ``slots`` at a time so the archive
+    stays within REPORT_QUEUE_LIMIT; they are appended in completion order. A
+    report that fails to render is listed in an ``errors.txt`` member instead,
+    since the response status has long been sent by then. Closing the
+    generator early (the client went away) cancels the renders still queued.
+    """
+    names = member_names(datasets)
+    cached, missing = [], deque()
+    for dataset in datasets:
+        path = report_path(dataset.id)
+        if path.exists():
+            cached.append((dataset, path))
+        else:
+            missing.append(dataset)
+    rendering = {}
+
+    def render_next():
+        dataset = missing.popleft()
+        job = Job.objects.create(user=user, dataset=dataset, kind=Job.KIND_REPORT)
+        rendering[queue_report(job)] = dataset, job
+
+    for _ in range(min(slots, len(missing))):
+        render_next()
+
+    def finished():
+        yield from cached
+        while rendering:
+            done, _ = wait(rendering, return_when=FIRST_COMPLETED)
+            for future in done:
+                dataset, job = rendering.pop(future)
+                if missing:
+                    render_next()
+                error = report_error(job, future)
+                if error:
+                    errors.append(f"{names[dataset.id]}: {error}")
+                else:
+                    yield dataset, report_path(dataset.id)
+
+    buffer = _StreamBuffer()
+    errors = []
+    try:
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for dataset, path in finished():
+                try:
+                    yield from _write_member(archive, buffer, names[dataset.id], path)
+                except FileNotFoundError:
+                    # Invalidated between lookup and read
+                    errors.append(f"{names[dataset.id]}: report was removed while archiving")
+            if errors:
+                archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+        yield buffer.drain()
+    finally:
+        # Client gone (the response closes this generator): free the render
+        # pool of the queued renders. Running ones finish into the cache.
+        missing.clear()
+        for future in rendering:
+            future.cancel()
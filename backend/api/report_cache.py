@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from django.conf import settings
+
+# Bump whenever the report layout changes so stale cached PDFs are not served.
+REPORT_TEMPLATE_VERSION = 2
+
+
+def report_dir():
+    return Path(settings.MEDIA_ROOT) / 'reports'
+
+
+def report_path(dataset_id):
+    # Vector and raster reports are cached side by side
+    variant = '_vector' if settings.REPORT_VECTOR_CHARTS else ''
+    return report_dir() / f'{dataset_id}_v{REPORT_TEMPLATE_VERSION}{variant}.pdf'
+
+
+def invalidate_reports(dataset_id):
+    """Remove every cached report (all template versions) of a dataset."""
+    for path in report_dir().glob(f'{dataset_id}_v*.pdf'):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,316 @@
+"""PDF analytical reports, rendered once per dataset and template version."""
+import os
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from reportlab.graphics import renderPDF
+from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
+import pandas as pd
+
+from .models import EquipmentRecord, resolve_data_id
+from .summary import get_summary
+from .analytics import downsample, metric_column
+from .charts import breakdown_chart, trend_chart
+from .vector_charts import breakdown_drawing, trend_drawing
+from .report_cache import report_dir, report_path
+
+TREND_POINTS = 1000
+REPORT_FETCH_ROWS = 2000
+ROW_HEIGHT = 20
+TABLE_BOTTOM = 60  # lowest row baseline before the footer
+TABLE_FIELDS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+
+def render_report(id, out, vector=None):
+    """Draw the report for dataset ``id`` onto ``out`` (a path or binary file object).
+
+    ``vector`` draws the charts as reportlab vector graphics instead of PNG
+    images; it defaults to the REPORT_VECTOR_CHARTS setting.
+    """
+    if vector is None:
+        vector = settings.REPORT_VECTOR_CHARTS
+    p = canvas.Canvas(out)
+    width, height = 595.27, 841.89 # A4 Size
+
+    # --- COLORS & FONTS ---
+    TEAL_MAIN = (0.05, 0.58, 0.53) # #0d9488
+    TEAL_DARK = (0.0, 0.3, 0.28) 
+    TEAL_LIGHT = (0.94, 0.99, 0.98) # #f0fdfa
+    GRAY_TEXT = (0.2, 0.2, 0.2)
+    GRAY_SUB = (0.5, 0.5, 0.5)
+    GRAY_LINE = (0.9, 0.9, 0.9)
+
+    # --- HEADER ---
+    # Draw top banner
+    p.setFillColorRGB(*TEAL_MAIN)
+    p.rect(0, height - 80, width, 80, fill=1, stroke=0)
+
+    # Logo placeholder (Text for now)
+    p.setFont("Helvetica-Bold", 28)
+    p.setFillColorRGB(1, 1, 1)
+    p.drawString(40, height - 50, "ChemViz")
+
+    p.setFont("Helvetica", 12)
+    p.drawString(40, height - 68, "Advanced Chemical Process Analytics")
+
+    # Report Info (Right aligned)
+    p.setFont("Helvetica-Bold", 14)
+    p.drawRightString(width - 40, height - 45, "ANALYTICAL REPORT")
+
+    p.setFont("Helvetica", 9)
+    p.drawRightString(width - 40, height - 62, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    p.drawRightString(width - 40, height - 74, f"Dataset ID: #{id}")
+
+    # --- REUSABLE PAGE CHROME ---
+    # Static page furniture is recorded once as a form XObject and every page
+    # just references it; forms use absolute page coordinates.
+    forms = set()
+
+    def draw_form(name, draw):
+        if name not in forms:
+            p.beginForm(name)
+            draw()
+            p.endForm()
+            forms.add(name)
+        p.doForm(name)
+
+    # --- FOOTER HELPER ---
+    def footer_chrome():
+        p.setStrokeColorRGB(*GRAY_LINE)
+        p.line(40, 40, width - 40, 40)
+        p.setFont("Helvetica", 8)
+        p.setFillColorRGB(*GRAY_SUB)
+        p.drawString(40, 25, "ChemViz Analytics Platform • Confidential Report")
+
+    def draw_footer(canvas, page_num):
+        draw_form('footer', footer_chrome)
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColorRGB(*GRAY_SUB)
+        canvas.drawRightString(width - 40, 25, f"Page {page_num}")
+        canvas.restoreState()
+
+    # --- CONTENT ---
+    # Duplicate uploads share the records of the dataset they duplicate
+    data_id = resolve_data_id(id)
+    records = EquipmentRecord.objects.filter(dataset_id=data_id)
+    summary = get_summary(data_id)
+    total = summary.total_count if summary else 0
+
+    if total > 0:
+        avg_flow = summary.metrics['flowrate']['mean']
+        avg_press = summary.metrics['pressure']['mean']
+        avg_temp = summary.metrics['temperature']['mean']
+
+        y_pos = height - 120
+
+        # Title Section
+        p.setFont("Helvetica-Bold", 16)
+        p.setFillColorRGB(*GRAY_TEXT)
+        p.drawString(40, y_pos, "Executive Summary")
+        y_pos -= 10
+
+        # --- KPI CARDS ---
+        card_y = y_pos - 70
+        card_width = 120
+        card_height = 60
+        gap = 15
+
+        def draw_stat_box(x, title, value, unit, icon_color=(0.9, 0.9, 0.9)):
+            # Shadow effect
+            p.setFillColorRGB(0.95, 0.95, 0.95)
+            p.roundRect(x+2, card_y-2, card_width, card_height, 6, fill=1, stroke=0)
+            # Main box
+            p.setFillColorRGB(1, 1, 1)
+            p.setStrokeColorRGB(0.9, 0.9, 0.9)
+            p.roundRect(x, card_y, card_width, card_height, 6, fill=1, stroke=1)
+
+            # Title
+            p.setFont("Helvetica", 9)
+            p.setFillColorRGB(*GRAY_SUB)
+            p.drawString(x + 12, card_y + 42, title)
+
+            # Value
+            p.setFont("Helvetica-Bold", 18)
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.drawString(x + 12, card_y + 18, str(value))
+
+            # Unit
+            if unit:
+                p.setFont("Helvetica-Bold", 9)
+                p.setFillColorRGB(*GRAY_SUB)
+                p.drawRightString(x + card_width - 12, card_y + 20, unit)
+
+        draw_stat_box(40, "Total Records", str(total), "")
+        draw_stat_box(40 + card_width + gap, "Avg Flowrate", f"{avg_flow:.1f}", "L/min")
+        draw_stat_box(40 + 2*(card_width + gap), "Avg Pressure", f"{avg_press:.1f}", "PSI")
+        draw_stat_box(40 + 3*(card_width + gap), "Avg Temp", f"{avg_temp:.1f}", "°C")
+
+        # --- GRAPHS ---
+        y_pos = card_y - 30
+
+        # Charts only need two metric columns plus the precomputed per-type
+        # numbers, never a DataFrame of every row
+        flowrate = metric_column(data_id, 'flowrate')
+        pressure = metric_column(data_id, 'pressure')
+
+        # 1. Trend Chart
+        # LTTB keeps the chart's shape with a bounded number of points
+        flow_series = downsample(flowrate, TREND_POINTS)
+        press_series = downsample(pressure, TREND_POINTS)
+        del flowrate, pressure
+
+        graph_height = 180
+        if vector:
+            renderPDF.draw(trend_drawing(flow_series, press_series, 520, graph_height),
+                           p, 35, y_pos - graph_height)
+        else:
+            trend = trend_chart(flow_series, press_series)
+            p.drawImage(ImageReader(trend), 35, y_pos - graph_height, width=520, height=graph_height)
+
+        y_pos -= (graph_height + 30)
+
+        # 2. Side-by-Side: Distribution + Bar (Avg Flow per Type)
+        counts = pd.Series(summary.type_distribution).sort_values(ascending=False)
+        avg_by_type = pd.Series({t: means['flowrate'] for t, means in summary.type_means.items()})
+
+        graph_height_2 = 160
+        if vector:
+            renderPDF.draw(breakdown_drawing(counts, avg_by_type, 520, graph_height_2),
+                           p, 35, y_pos - graph_height_2)
+        else:
+            breakdown = breakdown_chart(counts, avg_by_type)
+            p.drawImage(ImageReader(breakdown), 35, y_pos - graph_height_2, width=520, height=graph_height_2)
+
+        draw_footer(p, 1)
+        p.showPage()
+
+        # --- PAGE 2: TABLE ---
+        # Table Schema
+        cols = [
+            {"name": "Equipment Name", "x": 40, "w": 180},
+            {"name": "Type", "x": 220, "w": 100},
+            {"name": "Flow (L/min)", "x": 320, "w": 80},
+            {"name": "Press (PSI)", "x": 400, "w": 80},
+            {"name": "Temp (°C)", "x": 480, "w": 80},
+        ]
+
+        def column_header(y):
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
+            p.setFillColorRGB(1, 1, 1)
+            p.setFont("Helvetica-Bold", 9)
+            for col in cols:
+                p.drawString(col["x"] + 10, y + 2, col["name"])
+
+        def first_page_chrome():
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.rect(0, height - 60, width, 60, fill=1, stroke=0)
+            p.setFont("Helvetica-Bold", 18)
+            p.setFillColorRGB(1, 1, 1)
+            p.drawString(40, height - 40, "Detailed Equipment Logs")
+            column_header(height - 100)
+
+        def continued_page_chrome():
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.rect(0, height - 40, width, 40, fill=1, stroke=0)
+            p.setFont("Helvetica-Bold", 14)
+            p.setFillColorRGB(1, 1, 1)
+            p.drawString(40, height - 28, "Detailed Equipment Logs (Cont.)")
+            column_header(height - 80)
+
+        def stripes(top, rows, parity):
+            # Row backgrounds, alternating with the row's overall index
+            p.setFillColorRGB(*TEAL_LIGHT)
+            for i in range(rows):
+                if (i + parity) % 2 == 0:
+                    p.rect(40, top - i * ROW_HEIGHT - 6, 515, 18, fill=1, stroke=0)
+
+        # Stream rows in id order, a bounded chunk at a time (no model instances,
+        # no queryset result cache), and lay them out a page at a time
+        rows = records.order_by('id').rows(TABLE_FIELDS, REPORT_FETCH_ROWS)
+        page_num = 2
+        index = 0
+        first_page_chrome()
+        while True:
+            page_kind, top = ('cont', height - 105) if index else ('first', height - 125)
+            capacity = int((top - TABLE_BOTTOM) // ROW_HEIGHT) + 1
+            page_rows = list(islice(rows, capacity))
+            if not page_rows:
+                break
+            if index:
+                draw_footer(p, page_num)
+                p.showPage()
+                page_num += 1
+                draw_form('table-cont', continued_page_chrome)
+
+            # Full pages share one stripe form per layout and parity
+            parity = index % 2
+            if len(page_rows) == capacity:
+                draw_form(f'stripes-{page_kind}-{parity}', lambda: stripes(top, capacity, parity))
+            else:
+                stripes(top, len(page_rows), parity)
+
+            # Cell Content, as one text object per page
+            text = p.beginText()
+            text.setFont("Helvetica", 9)
+            text.setFillColorRGB(*GRAY_TEXT)
+            for i, (equipment_name, equipment_type, flowrate, pressure, temperature) in enumerate(page_rows):
+                y = top - i * ROW_HEIGHT
+                for col, value in zip(cols, (str(equipment_name)[:28], str(equipment_type),
+                                             f"{flowrate:.1f}", f"{pressure:.1f}")):
+                    text.setTextOrigin(col["x"] + 10, y)
+                    text.textOut(value)
+
+                # Conditional color for Temp
+                text.setTextOrigin(cols[4]["x"] + 10, y)
+                if temperature > 100:
+                    text.setFillColorRGB(0.8, 0.2, 0.2)
+                    text.setFont("Helvetica-Bold", 9)
+                    text.textOut(f"{temperature:.1f}")
+                    text.setFillColorRGB(*GRAY_TEXT)
+                    text.setFont("Helvetica", 9)
+                else:
+                    text.textOut(f"{temperature:.1f}")
+            p.drawText(text)
+            index += len(page_rows)
+
+        draw_footer(p, page_num)
+
+    else:
+        p.setFont("Helvetica", 12)
+        p.drawString(40, height - 150, "No data records found in this dataset.")
+
+    p.showPage()
+    p.save()
+
+
+def report_filename(dataset):
+    original_filename = dataset.file.name.split('/')[-1]
+    return original_filename.rsplit('.', 1)[0] + '_report.pdf'
+
+
+def get_or_render_report(dataset_id):
+    """Path of the cached report for ``dataset_id``, rendering it on a miss.
+
+    Uploaded datasets never change, so a report only has to be rebuilt when
+    REPORT_TEMPLATE_VERSION is bumped. The canvas writes straight to a
+    temporary file that is atomically renamed into place, so concurrent
+    requests never see a partial PDF and no in-memory copy of the document is
+    kept around.
+    """
+    path = report_path(dataset_id)
+    if not path.exists():
+        report_dir().mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=report_dir(), suffix='.tmp')
+        os.close(fd)
+        try:
+            render_report(dataset_id, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+    return path
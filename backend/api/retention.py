@@ -0,0 +1,43 @@
+"""Keep-the-newest-N-datasets-per-user retention, enforced outside requests.
+
+``sweep()`` is run on the background cleanup thread after uploads (see
+:func:`api.jobs.schedule_sweep`) and by ``manage.py sweep_datasets``. Failed
+datasets (including uploads whose ingest job died and deletions whose delete
+job died, see :mod:`api.recovery`) hold no slot and are always purged.
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .deletion import claim_for_deletion, run_deletion
+from .models import Dataset, Job
+from .recovery import fail_stale_jobs
+
+
+def expired_datasets():
+    """Failed datasets, then those beyond each user's ``DATASET_RETENTION``
+    newest, oldest first.
+
+    Uploads still being ingested count towards the limit but are only removed
+    by a later sweep, once their ingest job has finished.
+    """
+    failed = Dataset.objects.filter(status=Dataset.STATUS_FAILED).order_by('uploaded_at')
+    ranked = (Dataset.objects.exclude(status__in=[Dataset.STATUS_DELETING, Dataset.STATUS_FAILED])
+              .annotate(rank=Window(RowNumber(), partition_by=F('user_id'),
+                                    order_by=F('uploaded_at').desc())))
+    expired = ranked.filter(rank__gt=settings.DATASET_RETENTION).order_by('uploaded_at')
+    # Not .exclude(): Django would apply it before ranking, inside the window's subquery
+    return list(failed) + [d for d in expired if d.status != Dataset.STATUS_PENDING]
+
+
+def sweep():
+    """Fail dead jobs, then purge every expired dataset; returns how many were removed."""
+    for kind in (Job.KIND_INGEST, Job.KIND_REPORT, Job.KIND_DELETE):
+        fail_stale_jobs(kind)
+    purged = 0
+    for dataset in expired_datasets():
+        # Skip datasets a delete request or another sweep got to first
+        job = claim_for_deletion(dataset, dataset.user)
+        if job is not None and run_deletion(job):
+            purged += 1
+    return purged
@@ -1,12 +1,44 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Dataset, EquipmentRecord
+from .models import Dataset, EquipmentRecord, Job
 
 class EquipmentRecordSerializer(serializers.ModelSerializer):
+    equipment_type = serializers.SlugRelatedField(slug_field='name', read_only=True)
+
     class Meta:
         model = EquipmentRecord
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        # Optional projection: EquipmentRecordSerializer(..., fields=['id', 'flowrate'])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 class DatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dataset
-        fields = ['id', 'file', 'uploaded_at']
+        fields = ['id', 'file', 'uploaded_at', 'status', 'source']
+        read_only_fields = ['status', 'source']
+
+class JobSerializer(serializers.ModelSerializer):
+    throughput = serializers.SerializerMethodField()
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'dataset', 'rows_processed', 'throughput', 'error',
+                  'created_at', 'started_at', 'finished_at', 'result_url']
+
+    def get_throughput(self, obj):
+        return obj.throughput()
+
+    def get_result_url(self, obj):
+        # Finished report jobs: the (now cached) PDF download
+        if obj.kind != Job.KIND_REPORT or obj.status != Job.STATUS_DONE or obj.dataset_id is None:
+            return None
+        url = reverse('dataset-pdf', kwargs={'id': obj.dataset_id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
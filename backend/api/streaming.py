@@ -0,0 +1,44 @@
+import json
+
+from django.http import StreamingHttpResponse
+
+STREAM_CHUNK_ROWS = 2000
+
+
+def _encoded_rows(queryset, fields, chunk_size):
+    """JSON-encode rows straight from ``values_list`` tuples (no model
+    instances, no serializer), ``chunk_size`` rows per database fetch."""
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    for row in queryset.rows(fields, chunk_size):
+        yield dumps(dict(zip(fields, row)))
+
+
+def _batched(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_json(queryset, fields, chunk_size=STREAM_CHUNK_ROWS):
+    """Stream ``queryset`` as a JSON array of objects."""
+    def generate():
+        yield '['
+        sep = ''
+        for batch in _batched(_encoded_rows(queryset, fields, chunk_size), chunk_size):
+            yield sep + ','.join(batch)
+            sep = ','
+        yield ']'
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+def stream_ndjson(queryset, fields, chunk_size=STREAM_CHUNK_ROWS):
+    """Stream ``queryset`` as newline-delimited JSON, one object per line."""
+    def generate():
+        for batch in _batched(_encoded_rows(queryset, fields, chunk_size), chunk_size):
+            yield '\n'.join(batch) + '\n'
+    return StreamingHttpResponse(generate(), content_type='application/x-ndjson')
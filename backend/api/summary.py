@@ -0,0 +1,133 @@
+from django.db.models import Avg, Count, Max, Min, Variance
+
+import numpy as np
+import pandas as pd
+
+from .models import Dataset, DatasetSummary, EquipmentRecord, EquipmentType
+from .tdigest import TDigest
+
+METRICS = ['flowrate', 'pressure', 'temperature']
+
+
+class SummaryAccumulator:
+    """Per-type count / mean / M2 / min / max and metric quantile sketches,
+    merged chunk by chunk.
+
+    Chunks are reduced with one pandas groupby each and folded into the running
+    state with Chan's parallel variance update, so a pass over the file never
+    needs more than one chunk in memory.
+    """
+
+    def __init__(self):
+        self.count = pd.Series(dtype='int64')
+        self.mean = pd.DataFrame(columns=METRICS, dtype='float64')
+        self.m2 = pd.DataFrame(columns=METRICS, dtype='float64')
+        self.min = pd.DataFrame(columns=METRICS, dtype='float64')
+        self.max = pd.DataFrame(columns=METRICS, dtype='float64')
+        self.sketches = {}  # {type: {metric: TDigest}}
+
+    def update(self, chunk):
+        if chunk.empty:
+            return
+        grouped = chunk.groupby('equipment_type')[METRICS]
+        count = grouped.size()
+        mean = grouped.mean()
+        m2 = grouped.var(ddof=0).mul(count, axis=0)
+        types = self.count.index.union(count.index)
+
+        n_a = self.count.reindex(types, fill_value=0).astype('float64')
+        n_b = count.reindex(types, fill_value=0).astype('float64')
+        n = n_a + n_b
+        mean_a = self.mean.reindex(types).fillna(0.0)
+        mean_b = mean.reindex(types).fillna(0.0)
+        delta = mean_b - mean_a
+
+        self.mean = mean_a + delta.mul(n_b / n, axis=0)
+        self.m2 = (self.m2.reindex(types).fillna(0.0) + m2.reindex(types).fillna(0.0)
+                   + (delta ** 2).mul(n_a * n_b / n, axis=0))
+        self.min = self.min.reindex(types).combine(grouped.min().reindex(types), np.fmin)
+        self.max = self.max.reindex(types).combine(grouped.max().reindex(types), np.fmax)
+        self.count = n.astype('int64')
+
+        for name, rows in grouped.indices.items():
+            sketches = self.sketches.setdefault(name, {m: TDigest() for m in METRICS})
+            for m in METRICS:
+                sketches[m].add(chunk[m].to_numpy()[rows])
+
+    def finalize(self):
+        """Return the fields of a DatasetSummary row."""
+        total = int(self.count.sum())
+        metrics = {}
+        for m in METRICS:
+            if total == 0:
+                metrics[m] = {'mean': None, 'min': None, 'max': None, 'std': None}
+                continue
+            mean = float((self.mean[m] * self.count).sum() / total)
+            m2 = float(self.m2[m].sum() + ((self.mean[m] - mean) ** 2 * self.count).sum())
+            metrics[m] = {
+                'mean': mean,
+                'min': float(self.min[m].min()),
+                'max': float(self.max[m].max()),
+                'std': float(np.sqrt(m2 / (total - 1))) if total > 1 else 0.0,
+            }
+        return {
+            'total_count': total,
+            'metrics': metrics,
+            'type_distribution': {t: int(c) for t, c in self.count.items()},
+            'type_means': {t: {m: float(self.mean.at[t, m]) for m in METRICS} for t in self.count.index},
+            'sketches': None if self.sketches is None else {
+                t: {m: d.to_dict() for m, d in sketches.items()} for t, sketches in sorted(self.sketches.items())
+            },
+        }
+
+
+def save_summary(dataset_id, accumulator):
+    summary, _ = DatasetSummary.objects.update_or_create(dataset_id=dataset_id,
+                                                         defaults=dict(accumulator.finalize(), correlation=None,
+                                                                       histograms={}))
+    return summary
+
+
+def _type_aggregates(dataset_id):
+    """Per-type count / mean / variance / min / max of a dataset's records, as
+    one grouped query on the integer type id, grouped in the order of the
+    (dataset, equipment_type) index."""
+    aggregates = {'count': Count('id')}
+    for m in METRICS:
+        aggregates.update({
+            f'{m}_mean': Avg(m),
+            f'{m}_var': Variance(m),  # population variance, turned back into M2 below
+            f'{m}_min': Min(m),
+            f'{m}_max': Max(m),
+        })
+    return (EquipmentRecord.objects.filter(dataset_id=dataset_id)
+            .values('equipment_type').order_by().annotate(**aggregates))
+
+
+def _summarize_records(dataset_id):
+    """Summarize stored records with a single grouped aggregate query, for
+    datasets ingested before summaries existed. Type names are attached
+    afterwards."""
+    query = _type_aggregates(dataset_id)
+    groups = pd.DataFrame.from_records(
+        query, columns=['equipment_type'] + list(query.query.annotations),
+    ).set_index('equipment_type').rename(index=EquipmentType.names()).sort_index()
+
+    acc = SummaryAccumulator()
+    acc.sketches = None  # needs the rows; built on first use by api.quantiles
+    if not groups.empty:
+        acc.count = groups['count'].astype('int64')
+        acc.mean = groups[[f'{m}_mean' for m in METRICS]].set_axis(METRICS, axis=1)
+        acc.m2 = groups[[f'{m}_var' for m in METRICS]].set_axis(METRICS, axis=1).mul(acc.count, axis=0)
+        acc.min = groups[[f'{m}_min' for m in METRICS]].set_axis(METRICS, axis=1)
+        acc.max = groups[[f'{m}_max' for m in METRICS]].set_axis(METRICS, axis=1)
+    return save_summary(dataset_id, acc)
+
+
+def get_summary(dataset_id):
+    """Return the DatasetSummary for a dataset, backfilling it once for legacy
+    datasets. Returns None while the dataset is not ready."""
+    summary = DatasetSummary.objects.filter(dataset_id=dataset_id).first()
+    if summary is None and Dataset.objects.filter(id=dataset_id, status=Dataset.STATUS_READY).exists():
+        summary = _summarize_records(dataset_id)
+    return summary
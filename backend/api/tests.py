@@ -1,3 +1,1042 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import RestrictedError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .analytics import _bucket_edges, build_store, column_frame, lttb
+from .charts import breakdown_chart, trend_chart
+from .deletion import claim_for_deletion, delete_records, run_deletion
+from .column_store import COLUMNS, has_store, read_column, remove_store, store_dir
+from .columnar import FETCH_ROWS, encode_queryset
+from .histogram import CACHED_HISTOGRAMS, MAX_BINS, compute_histogram, get_histogram
+from .ingest import ingest_csv
+from .jobs import active_report_jobs, run_report_job, submit_render
+from .models import Dataset, DatasetSummary, EquipmentRecord, EquipmentType, Job
+from .recovery import INTERRUPTED
+from .report_cache import invalidate_reports, report_dir, report_path
+from .reports import TABLE_FIELDS, get_or_render_report, render_report
+from .retention import sweep
+from .summary import _type_aggregates, get_summary
+from .tdigest import TDigest, rank_error
+from .views import DatasetRecordsView
+
+
+TEST_MEDIA = tempfile.TemporaryDirectory()
+HEADER = "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+
+
+class InlinePool:
+    """Stands in for a worker pool: runs submitted work at once, inside the test's transaction."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def csv_dataset(user, name, text):
+    """A dataset whose file (under TEST_MEDIA) holds ``text``."""
+    path = Path(TEST_MEDIA.name, 'datasets', name)
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(text)
+    return Dataset.objects.create(user=user, file=f'datasets/{name}', status=Dataset.STATUS_PENDING)
+
+
+def plant_frame(rows, seed=0):
+    """Random rows with the CSV's columns: three types, metrics on different scales."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Equipment Name': [f'E-{i}' for i in range(rows)],
+        'Type': rng.choice(['Pump', 'Valve', 'Reactor'], rows),
+        'Flowrate': rng.gamma(2.0, 50.0, rows).round(3),
+        'Pressure': rng.normal(6.0, 1.5, rows).round(3),
+        'Temperature': rng.uniform(20.0, 140.0, rows).round(3),
+    })
+
+
+def ingested(user, name, frame, chunk_rows=None):
+    """A ready dataset holding ``frame``, ingested like an upload."""
+    dataset = csv_dataset(user, name, frame.to_csv(index=False))
+    ingest_csv(dataset, chunk_rows=chunk_rows)
+    Dataset.objects.filter(pk=dataset.pk).update(status=Dataset.STATUS_READY)
+    dataset.refresh_from_db()
+    return dataset
+
+
+CSV_METRICS = {'flowrate': 'Flowrate', 'pressure': 'Pressure', 'temperature': 'Temperature'}
+
+
+class RecordIndexPlanTests(TestCase):
+    """The hot per-dataset queries are answered from EquipmentRecord's indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('planner')
+        cls.dataset = Dataset.objects.create(user=user, file='datasets/plan.csv')
+        pump, valve = EquipmentType.objects.bulk_create([EquipmentType(name='Pump'), EquipmentType(name='Valve')])
+        EquipmentRecord.objects.bulk_create([
+            EquipmentRecord(dataset=cls.dataset, equipment_name=f'E-{i}', equipment_type=(pump, valve)[i % 2],
+                            flowrate=i, pressure=i / 10, temperature=20 + i)
+            for i in range(50)
+        ])
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are cheaper to scan; ask for the plan the index allows
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('USE TEMP B-TREE', plan)  # no sort or grouping pass of its own
+        return plan
+
+    def test_stats_aggregate_uses_dataset_type_index(self):
+        self.assertUsesIndex(_type_aggregates(self.dataset.id), 'record_dataset_type_idx')
+
+    def test_records_page_uses_dataset_id_index(self):
+        view = DatasetRecordsView(kwargs={'id': self.dataset.id})
+        view.request = Request(APIRequestFactory().get('/', {'limit': 10}))
+        after = EquipmentRecord.objects.order_by('id').values_list('id', flat=True)[10]
+        self.assertUsesIndex(view.get_queryset().filter(id__gt=after), 'record_dataset_id_idx')
+
+    def test_report_table_uses_dataset_id_index(self):
+        queryset = EquipmentRecord.objects.filter(dataset_id=self.dataset.id).order_by('id')
+        self.assertUsesIndex(queryset.values_list(*TABLE_FIELDS), 'record_dataset_id_idx')
+
+
+def decode_columns(body):
+    """``{name: list}`` of a columnar payload (see api.columnar)."""
+    header_len, = struct.unpack_from('<I', body, 4)
+    header = json.loads(body[8:8 + header_len])
+    columns = {}
+    for spec in header['columns']:
+        data = np.frombuffer(body, dtype=spec['dtype'], count=header['rows'], offset=8 + header_len + spec['offset'])
+        columns[spec['name']] = [spec['dictionary'][c] for c in data] if 'dictionary' in spec else data.tolist()
+    return columns
+
+
+class ColumnarTests(TestCase):
+    def test_queryset_round_trip_across_batches(self):
+        user = User.objects.create_user('columns')
+        dataset = Dataset.objects.create(user=user, file='datasets/c.csv')
+        pump, valve = EquipmentType.objects.create(name='Pump'), EquipmentType.objects.create(name='Valve')
+        EquipmentRecord.objects.bulk_create([
+            EquipmentRecord(dataset=dataset, equipment_name=f'E-{i % 7}', equipment_type=(pump, valve)[i % 3 == 0],
+                            flowrate=i / 4, pressure=-i, temperature=20 + i)
+            for i in range(25)
+        ])
+        fields = ['id', 'equipment_name', 'equipment_type', 'flowrate']
+        queryset = EquipmentRecord.objects.filter(dataset=dataset).order_by('id')
+        with patch('api.columnar.FETCH_ROWS', 10):
+            columns = decode_columns(encode_queryset(queryset, fields))
+        self.assertEqual(list(zip(*columns.values())), list(queryset.rows(fields, FETCH_ROWS)))
+
+    def test_records_endpoint_serves_columns(self):
+        user = User.objects.create_user('columns')
+        dataset = Dataset.objects.create(user=user, file='datasets/c.csv')
+        EquipmentRecord.objects.create(dataset=dataset, equipment_name='E-1', flowrate=1, pressure=2, temperature=3,
+                                       equipment_type=EquipmentType.objects.create(name='Pump'))
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/datasets/{dataset.id}/data/', {'format': 'columns', 'fields': 'equipment_type,pressure'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.chemviz.columns')
+        self.assertEqual(decode_columns(response.content), {'equipment_type': ['Pump'], 'pressure': [2.0]})
+
+
+    def test_layout_is_aligned_and_negotiated(self):
+        user = User.objects.create_user('columns')
+        dataset = Dataset.objects.create(user=user, file='datasets/c.csv')
+        pump = EquipmentType.objects.create(name='Pump')
+        EquipmentRecord.objects.bulk_create([
+            EquipmentRecord(dataset=dataset, equipment_name=f'E-{i}', equipment_type=pump,
+                            flowrate=i, pressure=i, temperature=i)
+            for i in range(3)
+        ])
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/datasets/{dataset.id}/data/', {'fields': 'equipment_name,temperature'},
+                              HTTP_ACCEPT='application/vnd.chemviz.columns')
+        body = response.content
+        header_len, = struct.unpack_from('<I', body, 4)
+        header = json.loads(body[8:8 + header_len])
+        self.assertEqual((body[:4], header_len % 8, header['rows']), (b'CVZC', 0, 3))
+        self.assertTrue(all(spec['offset'] % 8 == 0 for spec in header['columns']))
+        self.assertEqual(decode_columns(body), {'equipment_name': ['E-0', 'E-1', 'E-2'],
+                                                'temperature': [0.0, 1.0, 2.0]})
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class ColumnStoreTests(TestCase):
+    """A dataset's column store holds exactly its records, in id order."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('store')
+        self.dataset = ingested(self.user, 'store.csv', plant_frame(300, seed=6), chunk_rows=70)
+
+    def stored(self):
+        return {name: read_column(self.dataset.id, name).tolist() for name in COLUMNS}
+
+    def test_ingest_writes_the_records(self):
+        fields = ['equipment_type_id' if name == 'equipment_type' else name for name in COLUMNS]
+        rows = EquipmentRecord.objects.filter(dataset=self.dataset).order_by('id').values_list(*fields)
+        self.assertEqual(self.stored(), dict(zip(COLUMNS, map(list, zip(*rows)))))
+
+    def test_database_fallback_and_rebuild_agree(self):
+        fields = ['equipment_type', 'flowrate', 'temperature']
+        from_store, stored = column_frame(self.dataset.id, fields), self.stored()
+        remove_store(self.dataset.id)
+        self.assertIsNone(read_column(self.dataset.id, 'flowrate'))
+        pd.testing.assert_frame_equal(column_frame(self.dataset.id, fields), from_store, check_categorical=False)
+        build_store(self.dataset.id)
+        self.assertEqual(self.stored(), stored)
+
+    def test_failed_ingest_publishes_no_store(self):
+        dataset = csv_dataset(self.user, 'broken.csv', HEADER + "A,Pump,1,2,3\nB,Pump,x,2,3\n")
+        with self.assertRaises(ValueError):
+            ingest_csv(dataset)
+        self.assertFalse(has_store(dataset.id))
+        self.assertFalse(store_dir(dataset.id).with_name(f'{dataset.id}.tmp').exists())
+
+
+class RecordExportTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('export')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        dataset = Dataset.objects.create(user=user, file='datasets/x.csv')
+        pump = EquipmentType.objects.create(name='Pump')
+        EquipmentRecord.objects.bulk_create([
+            EquipmentRecord(dataset=dataset, equipment_name=f'E-{i}', equipment_type=pump,
+                            flowrate=i, pressure=i, temperature=i)
+            for i in range(5)
+        ])
+        self.url = f'/api/datasets/{dataset.id}/data/'
+
+    def test_streams_every_row(self):
+        response = self.client.get(self.url, {'format': 'ndjson', 'fields': 'equipment_name,flowrate'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{'equipment_name': f'E-{i}', 'flowrate': i} for i in range(5)])
+        response = self.client.get(self.url, {'stream': 'true', 'fields': 'flowrate'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [{'flowrate': i} for i in range(5)])
+
+    def test_streams_match_the_serialized_list(self):
+        listed = self.client.get(self.url).json()
+        streamed = json.loads(b''.join(self.client.get(self.url, {'stream': 'true'}).streaming_content))
+        self.assertEqual(streamed, listed)
+        response = self.client.get(self.url, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], listed)
+
+    def test_full_exports_refuse_paging(self):
+        for params in ({'format': 'ndjson', 'limit': 2}, {'stream': 'true', 'cursor': 'x'},
+                       {'format': 'columns', 'limit': 2}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class RecordPageTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('pages')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        dataset = Dataset.objects.create(user=user, file='datasets/p.csv')
+        pump = EquipmentType.objects.create(name='Pump')
+        self.records = EquipmentRecord.objects.bulk_create([
+            EquipmentRecord(dataset=dataset, equipment_name=f'E-{i}', equipment_type=pump,
+                            flowrate=i, pressure=2 * i, temperature=3 * i)
+            for i in range(7)
+        ])
+        self.url = f'/api/datasets/{dataset.id}/data/'
+
+    def test_unpaginated_by_default(self):
+        data = self.client.get(self.url).data
+        self.assertEqual([row['equipment_name'] for row in data], [f'E-{i}' for i in range(7)])
+        self.assertEqual(data[0]['equipment_type'], 'Pump')
+
+    def test_cursor_pages_cover_every_record_once(self):
+        ids, url, params = [], self.url, {'limit': 3, 'fields': 'id'}
+        while url:
+            page = self.client.get(url, params).data
+            self.assertLessEqual(len(page['results']), 3)
+            ids += [row['id'] for row in page['results']]
+            url, params = page['next'], None
+        self.assertEqual(ids, [r.id for r in self.records])
+
+    def test_projection(self):
+        data = self.client.get(self.url, {'fields': 'id,pressure'}).data
+        self.assertEqual(data, [{'id': r.id, 'pressure': 2.0 * i} for i, r in enumerate(self.records)])
+        self.assertEqual(self.client.get(self.url, {'fields': 'id,colour'}).status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class SeriesViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('series')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_downsampled_points_lie_on_the_series(self):
+        frame = plant_frame(500, seed=2)
+        dataset = ingested(self.user, 'series.csv', frame)
+        data = self.client.get(f'/api/datasets/{dataset.id}/series/', {'metric': 'flowrate,pressure', 'points': 50}).data
+        self.assertEqual((data['total'], data['points']), (500, 50))
+        for metric, series in data['series'].items():
+            x = series['x']
+            self.assertEqual((len(x), x[0], x[-1]), (50, 0, 499))
+            self.assertEqual(series['y'], frame[CSV_METRICS[metric]].to_numpy()[x].tolist())
+
+    def test_bad_parameters(self):
+        dataset = Dataset.objects.create(user=self.user, file='datasets/s.csv')
+        url = f'/api/datasets/{dataset.id}/series/'
+        for params in ({'metric': 'colour'}, {'points': 2}, {'points': 'many'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+    def test_missing_or_unready_dataset(self):
+        pending = Dataset.objects.create(user=self.user, file='datasets/p.csv', status=Dataset.STATUS_PENDING)
+        self.assertEqual(self.client.get(f'/api/datasets/{pending.id + 1}/series/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/datasets/{pending.id}/series/').status_code, 409)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class SummaryTests(TestCase):
+    """Summaries folded chunk by chunk equal the statistics of the whole file."""
+
+    def setUp(self):
+        self.frame = plant_frame(500)
+        self.dataset = ingested(User.objects.create_user('summary'), 'summary.csv', self.frame, chunk_rows=64)
+
+    def assertMatchesFrame(self, summary):
+        self.assertEqual(summary.total_count, len(self.frame))
+        for metric, column in CSV_METRICS.items():
+            described = self.frame[column].describe()  # sample std, like the summary's
+            for stat in ('mean', 'min', 'max', 'std'):
+                self.assertAlmostEqual(summary.metrics[metric][stat], described[stat], places=9, msg=f'{metric} {stat}')
+        self.assertEqual(summary.type_distribution, self.frame['Type'].value_counts().to_dict())
+        means = self.frame.groupby('Type')[list(CSV_METRICS.values())].mean()
+        for name, type_means in summary.type_means.items():
+            for metric, column in CSV_METRICS.items():
+                self.assertAlmostEqual(type_means[metric], means.at[name, column], places=9)
+
+    def test_ingest_summary_matches_pandas(self):
+        self.assertMatchesFrame(get_summary(self.dataset.id))
+
+    def test_backfill_from_records_matches_pandas(self):
+        DatasetSummary.objects.all().delete()
+        summary = get_summary(self.dataset.id)
+        self.assertIsNone(summary.sketches)
+        self.assertMatchesFrame(summary)
+
+    def test_no_summary_before_the_dataset_is_ready(self):
+        DatasetSummary.objects.all().delete()
+        Dataset.objects.filter(pk=self.dataset.pk).update(status=Dataset.STATUS_PENDING)
+        self.assertIsNone(get_summary(self.dataset.id))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class StatsViewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('stats')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.frame = plant_frame(400, seed=1)
+        self.dataset = ingested(user, 'stats.csv', self.frame)
+        self.url = f'/api/datasets/{self.dataset.id}/stats/'
+
+    def test_statistics_and_quantiles(self):
+        data = self.client.get(self.url, {'quantiles': '0.1,0.5'}).data
+        self.assertEqual(data['total_count'], 400)
+        self.assertAlmostEqual(data['average_pressure'], self.frame['Pressure'].mean(), places=9)
+        self.assertAlmostEqual(data['metrics']['temperature']['max'], self.frame['Temperature'].max())
+        self.assertEqual(set(data['type_means']), {'Pump', 'Valve', 'Reactor'})
+        for metric, column in CSV_METRICS.items():
+            values = np.sort(self.frame[column].to_numpy())
+            for q in (0.1, 0.5):
+                key = f'p{q * 100:g}'
+                rank = np.searchsorted(values, data['quantiles']['metrics'][metric][key]) / len(values)
+                self.assertLessEqual(abs(rank - q), data['quantiles']['rank_error'][key] + 1 / len(values))
+
+    def test_bad_quantiles_are_refused(self):
+        for quantiles in ('1.5', 'half', ','.join(['0.5'] * 11)):
+            self.assertEqual(self.client.get(self.url, {'quantiles': quantiles}).status_code, 400, quantiles)
+
+    def test_empty_dataset_is_not_found(self):
+        empty = ingested(self.dataset.user, 'empty.csv', self.frame.head(0))
+        self.assertEqual(self.client.get(f'/api/datasets/{empty.id}/stats/').status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class CorrelationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('correlate')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.frame = plant_frame(400, seed=7)
+        self.frame['Pressure'] += self.frame['Flowrate'] / 20  # something to find
+        self.dataset = ingested(user, 'corr.csv', self.frame)
+        self.url = f'/api/datasets/{self.dataset.id}/correlation/'
+
+    def assertStatistics(self, data, frame):
+        values = frame[list(CSV_METRICS.values())]
+        np.testing.assert_allclose(data['pearson'], np.corrcoef(values.to_numpy(), rowvar=False))
+        np.testing.assert_allclose(data['spearman'], values.corr(method='spearman').to_numpy())
+        for fit in data['fits']:
+            slope, intercept = np.polyfit(frame[CSV_METRICS[fit['x']]], frame[CSV_METRICS[fit['y']]], 1)
+            np.testing.assert_allclose([fit['slope'], fit['intercept']], [slope, intercept])
+        self.assertEqual(len(data['fits']), 6)
+
+    def test_matches_numpy(self):
+        data = self.client.get(self.url).data
+        self.assertEqual((data['metrics'], data['count']), (list(CSV_METRICS), 400))
+        self.assertNotIn('by_type', data)
+        self.assertStatistics(data, self.frame)
+
+    def test_by_type(self):
+        by_type = self.client.get(self.url, {'by_type': 'true'}).data['by_type']
+        self.assertEqual(set(by_type), {'Pump', 'Valve', 'Reactor'})
+        for name, group in self.frame.groupby('Type'):
+            self.assertEqual(by_type[name]['count'], len(group))
+            self.assertStatistics(by_type[name], group)
+
+    def test_constant_column_is_undefined(self):
+        frame = self.frame.assign(Temperature=25.0)
+        dataset = ingested(self.dataset.user, 'flat.csv', frame)
+        data = self.client.get(f'/api/datasets/{dataset.id}/correlation/').data
+        self.assertEqual(data['pearson'][2], [None, None, None])
+        self.assertIsNone(next(f for f in data['fits'] if f['x'] == 'temperature')['slope'])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class CompareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('comparer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.frames = [plant_frame(300, seed=9), plant_frame(200, seed=10)]
+        self.frames[1]['Flowrate'] *= 1.5
+        self.datasets = [ingested(self.user, f'cmp{i}.csv', frame) for i, frame in enumerate(self.frames)]
+
+    def compare(self, datasets):
+        return self.client.get('/api/datasets/compare/', {'ids': ','.join(str(d.id) for d in datasets)})
+
+    def test_changes_against_the_baseline(self):
+        data = self.compare(self.datasets).data
+        base, other = data['datasets']
+        self.assertEqual((data['baseline'], base['id'], other['id']), (self.datasets[0].id, *[d.id for d in self.datasets]))
+        self.assertIsNone(base['changes'])
+        self.assertEqual(other['changes']['total_count']['delta'], -100)
+        self.assertAlmostEqual(other['changes']['total_count']['pct'], -100 / 3)
+        base_mean, mean = (frame['Flowrate'].mean() for frame in self.frames)
+        change = other['changes']['metrics']['flowrate']['mean']
+        self.assertAlmostEqual(change['delta'], mean - base_mean)
+        self.assertAlmostEqual(change['pct'], (mean - base_mean) / base_mean * 100)
+        counts = [frame['Type'].value_counts() for frame in self.frames]
+        self.assertEqual(other['changes']['type_distribution']['Pump']['delta'], counts[1]['Pump'] - counts[0]['Pump'])
+
+    def test_quantiles_cover_every_dataset_once(self):
+        alias = Dataset.objects.create(user=self.user, file='datasets/cmp0_2.csv', source=self.datasets[0])
+        data = self.compare(self.datasets + [alias]).data
+        self.assertEqual(data['datasets'][2]['changes']['total_count']['delta'], 0)
+        values = np.sort(pd.concat(self.frames)['Flowrate'].to_numpy())  # the alias adds no rows
+        rank = np.searchsorted(values, data['quantiles']['metrics']['flowrate']['p50']) / len(values)
+        self.assertLessEqual(abs(rank - 0.5), data['quantiles']['rank_error']['p50'] + 1 / len(values))
+
+    def test_bad_id_lists(self):
+        pending = Dataset.objects.create(user=self.user, file='datasets/p.csv', status=Dataset.STATUS_PENDING)
+        for datasets, code in (([], 400), ([self.datasets[0], pending], 409),
+                               ([Dataset(id=pending.id + 1)], 404)):
+            self.assertEqual(self.compare(datasets).status_code, code, datasets)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class HistogramViewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('histogram')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        # One decimal: plenty of values right on bin edges
+        self.frame = plant_frame(1000, seed=8).round(1)
+        self.dataset = ingested(user, 'hist.csv', self.frame)
+        self.url = f'/api/datasets/{self.dataset.id}/histogram/'
+
+    def test_histogram_matches_numpy(self):
+        data = self.client.get(self.url, {'x': 'flowrate', 'bins': 12}).data
+        counts, edges = np.histogram(self.frame['Flowrate'], 12)
+        self.assertEqual((data['count'], data['x_counts']), (1000, counts.tolist()))
+        np.testing.assert_allclose(data['x_edges'], edges)
+
+    def test_every_bin_count_matches_numpy(self):
+        summary = get_summary(self.dataset.id)
+        for bins in range(1, MAX_BINS + 1):
+            counts = compute_histogram(summary, 'flowrate', bins)['x_counts']
+            self.assertEqual(counts, np.histogram(self.frame['Flowrate'], bins)[0].tolist(), f'bins={bins}')
+
+    def test_grid_matches_numpy(self):
+        data = self.client.get(self.url, {'x': 'pressure', 'y': 'temperature', 'bins': '8,5'}).data
+        counts, x_edges, y_edges = np.histogram2d(self.frame['Pressure'], self.frame['Temperature'], [8, 5])
+        self.assertEqual(data['counts'], counts.astype(int).tolist())
+        self.assertEqual((data['x_counts'], data['y_counts']),
+                         (counts.sum(axis=1).astype(int).tolist(), counts.sum(axis=0).astype(int).tolist()))
+        np.testing.assert_allclose(data['x_edges'], x_edges)
+        np.testing.assert_allclose(data['y_edges'], y_edges)
+
+    def test_bad_parameters(self):
+        for params in ({'x': 'colour'}, {'x': 'flowrate', 'y': 'flowrate2'}, {'x': 'flowrate', 'bins': 0},
+                       {'x': 'flowrate', 'bins': '1,2,3'}, {'x': 'flowrate', 'bins': 'ten'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class HistogramCacheTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('bins')
+        dataset = csv_dataset(user, 'bins.csv', HEADER + "A,Pump,1,2,3\nB,Valve,4,5,6\n")
+        ingest_csv(dataset)
+        self.summary = get_summary(dataset.id)
+
+    def test_evicts_the_oldest_entry_whatever_the_key_order(self):
+        for bins in range(1, CACHED_HISTOGRAMS + 1):
+            get_histogram(self.summary, 'flowrate', bins)
+        # jsonb-style reordering: the oldest entry no longer comes first
+        self.summary.histograms = dict(sorted(self.summary.histograms.items(), reverse=True))
+        get_histogram(self.summary, 'pressure', 5)
+        self.summary.refresh_from_db()
+        cached = self.summary.histograms
+        self.assertEqual(len(cached), CACHED_HISTOGRAMS)
+        self.assertNotIn('flowrate:1', cached)
+        self.assertIn('flowrate:2', cached)
+        self.assertIn('pressure:5', cached)
+
+
+class TDigestTests(SimpleTestCase):
+    """Quantile estimates stay within the documented rank error bound."""
+    QS = [0.01, 0.5, 0.95, 0.99, 0.999]
+
+    def assertWithinBound(self, digest, values):
+        values = np.sort(values)
+        for q, estimate in zip(self.QS, digest.quantiles(self.QS)):
+            rank = np.searchsorted(values, estimate) / len(values)
+            self.assertLessEqual(abs(rank - q), rank_error(q), f'q={q}')
+
+    def test_chunked_stream(self):
+        values = np.random.default_rng(0).lognormal(size=200_000)
+        digest = TDigest()
+        for chunk in np.array_split(values, 20):
+            digest.add(chunk)
+        self.assertEqual(digest.count, len(values))
+        self.assertLessEqual(len(digest.means), digest.compression / 2 + 1)
+        self.assertEqual((digest.min, digest.max), (values.min(), values.max()))
+        self.assertWithinBound(digest, values)
+
+    def test_merged_digests(self):
+        parts = [np.random.default_rng(seed).normal(seed, 1, 50_000) for seed in range(5)]
+        merged = TDigest.merged([TDigest.from_dict(TDigest().add(p).to_dict()) for p in parts] + [TDigest()])
+        self.assertEqual(merged.count, 250_000)
+        self.assertWithinBound(merged, np.concatenate(parts))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class IngestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ingest')
+
+    def test_failed_ingest_leaves_no_records(self):
+        rows = [f"E-{i},Pump,1.5,2.5,3.5\n" for i in range(50)] + ["E-bad,Pump,not a number,1,1\n"]
+        dataset = csv_dataset(self.user, 'bad.csv', HEADER + ''.join(rows))
+        with self.assertRaises(ValueError), self.settings(DELETE_CHUNK_ROWS=7):
+            ingest_csv(dataset, chunk_rows=10)
+        self.assertFalse(EquipmentRecord.objects.exists())
+
+    def test_chunks_add_up_to_the_file(self):
+        rows = [(f'E-{i}', ('Pump', 'Valve', 'Reactor')[i % 3], i / 2, i * 3, 100 - i) for i in range(25)]
+        dataset = csv_dataset(self.user, 'chunks.csv', HEADER + ''.join('%s,%s,%s,%s,%s\n' % row for row in rows))
+        seen = []
+        self.assertEqual(ingest_csv(dataset, chunk_rows=10, batch_rows=4, progress=seen.append), 25)
+        self.assertEqual(seen, [10, 20, 25])
+        stored = EquipmentRecord.objects.filter(dataset=dataset).order_by('id').rows(TABLE_FIELDS, 100)
+        self.assertEqual(list(stored), rows)
+
+    def test_types_are_stored_once(self):
+        first = csv_dataset(self.user, 't1.csv', HEADER + "A,Pump,1,1,1\nB,Valve,1,1,1\nC,Pump,1,1,1\n")
+        second = csv_dataset(self.user, 't2.csv', HEADER + "D,Valve,1,1,1\nE,Reactor,1,1,1\n")
+        ingest_csv(first, chunk_rows=2)
+        ingest_csv(second)
+        ids = EquipmentType.ids_for(['Pump', 'Valve', 'Reactor'])
+        self.assertEqual(EquipmentType.objects.count(), 3)
+        self.assertEqual(list(EquipmentRecord.objects.order_by('id').values_list('equipment_type_id', flat=True)),
+                         [ids[t] for t in ('Pump', 'Valve', 'Pump', 'Valve', 'Reactor')])
+
+    def test_missing_value_names_its_line(self):
+        dataset = csv_dataset(self.user, 'gap.csv', HEADER + "A,Pump,1,2,3\nB,Pump,,2,3\n")
+        with self.assertRaisesMessage(ValueError, 'line 3'):
+            ingest_csv(dataset)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name, RETENTION_SWEEP_ON_UPLOAD=False)
+@patch('api.jobs.ingest_pool', InlinePool)
+class UploadTests(TestCase):
+    """Upload -> ingest job -> ready dataset, the job run inline on commit."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('uploader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/upload/', {'file': SimpleUploadedFile(name, text.encode())},
+                                    format='multipart')
+
+    def job(self, response):
+        return self.client.get(f"/api/jobs/{response.data['job']}/").data
+
+    def test_upload_is_ingested_by_its_job(self):
+        response = self.upload('plant.csv', HEADER + "A,Pump,1,2,3\nB,Valve,4,5,6\n")
+        self.assertEqual(response.status_code, 202)
+        job = self.job(response)
+        self.assertEqual((job['kind'], job['status'], job['rows_processed']), (Job.KIND_INGEST, Job.STATUS_DONE, 2))
+        self.assertEqual(Dataset.objects.get(pk=response.data['id']).status, Dataset.STATUS_READY)
+        self.assertEqual(EquipmentRecord.objects.filter(dataset_id=response.data['id']).count(), 2)
+
+    def test_missing_columns_are_refused(self):
+        response = self.upload('short.csv', "Equipment Name,Type,Flowrate\nA,Pump,1\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Pressure, Temperature', response.data['error'])
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_bad_value_fails_the_job(self):
+        response = self.upload('typo.csv', HEADER + "A,Pump,1,2,3\nB,Valve,fast,5,6\n")
+        self.assertEqual(response.status_code, 202)
+        job = self.job(response)
+        self.assertEqual(job['status'], Job.STATUS_FAILED)
+        self.assertIn('fast', job['error'])
+        self.assertEqual(Dataset.objects.get(pk=response.data['id']).status, Dataset.STATUS_FAILED)
+        self.assertFalse(EquipmentRecord.objects.exists())
+
+    def test_identical_upload_reuses_records(self):
+        text = HEADER + "A,Pump,1,2,3\nB,Valve,4,5,6\n"
+        original = self.upload('plant.csv', text).data
+        response = self.upload('plant_again.csv', text)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['status'], response.data['source']), (Dataset.STATUS_READY, original['id']))
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(EquipmentRecord.objects.count(), 2)
+        stats = self.client.get(f"/api/datasets/{response.data['id']}/stats/").data
+        self.assertEqual(stats['total_count'], 2)
+        # Another user's identical file is ingested for them
+        self.client.force_authenticate(User.objects.create_user('neighbour'))
+        self.assertEqual(self.upload('plant.csv', text).status_code, 202)
+        self.assertEqual(EquipmentRecord.objects.count(), 4)
+
+    def test_header_only_file_is_ready_and_empty(self):
+        response = self.upload('empty.csv', HEADER)
+        job = self.job(response)
+        self.assertEqual((job['status'], job['rows_processed']), (Job.STATUS_DONE, 0))
+        self.assertEqual(Dataset.objects.get(pk=response.data['id']).status, Dataset.STATUS_READY)
+        self.assertEqual(get_summary(response.data['id']).total_count, 0)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name, DELETE_CHUNK_ROWS=3)
+@patch('api.jobs.cleanup_pool', InlinePool)
+@patch('api.deletion.CHUNK_PAUSE', 0)
+class DeletionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('deleter')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dataset = ingested(self.user, 'doomed.csv', plant_frame(10, seed=5))
+        self.url = f'/api/datasets/{self.dataset.id}/'
+
+    def test_records_are_deleted_in_chunks(self):
+        self.assertEqual(list(delete_records(self.dataset.id)), [3, 6, 9, 10])
+        self.assertFalse(EquipmentRecord.objects.exists())
+
+    def test_delete_endpoint_runs_a_delete_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(self.url)
+        self.assertEqual((response.status_code, response.data['kind']), (202, Job.KIND_DELETE))
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual((job['status'], job['rows_processed']), (Job.STATUS_DONE, 10))
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(EquipmentRecord.objects.exists())
+        self.assertFalse(has_store(self.dataset.id))
+        self.assertFalse(Path(self.dataset.file.path).exists())
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+
+    def test_claimed_dataset_is_hidden_and_refused(self):
+        claim_for_deletion(self.dataset, self.user)
+        self.assertEqual(self.client.get('/api/datasets/').data['results'], [])
+        self.assertEqual(self.client.delete(self.url).status_code, 409)
+        self.assertEqual(EquipmentRecord.objects.count(), 10)  # until the job runs
+
+
+@override_settings(DATASET_RETENTION=2)
+class RetentionTests(TestCase):
+    """Sweeps keep each user's DATASET_RETENTION newest datasets."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('keeper')
+        self.start = timezone.now() - timedelta(days=1)
+
+    def dataset(self, minutes, user=None, status=Dataset.STATUS_READY):
+        dataset = Dataset.objects.create(user=user or self.user, file='datasets/k.csv', status=status)
+        Dataset.objects.filter(pk=dataset.pk).update(uploaded_at=self.start + timedelta(minutes=minutes))
+        return dataset
+
+    def test_sweep_keeps_the_newest_per_user(self):
+        oldest = self.dataset(0)
+        EquipmentRecord.objects.create(dataset=oldest, equipment_name='E-1', flowrate=1, pressure=1, temperature=1,
+                                       equipment_type=EquipmentType.objects.create(name='Pump'))
+        kept = [self.dataset(3), self.dataset(4, status=Dataset.STATUS_PENDING)]  # ingesting: counts, stays
+        self.dataset(1)
+        self.dataset(2)
+        failed = self.dataset(5, status=Dataset.STATUS_FAILED)
+        other = self.dataset(0, user=User.objects.create_user('other'))
+        self.assertEqual(Dataset.objects.count(), 7)  # saving purges nothing
+        self.assertEqual(sweep(), 4)
+        self.assertEqual(set(Dataset.objects.all()), set(kept + [other]))
+        self.assertNotIn(failed, Dataset.objects.all())
+        self.assertFalse(EquipmentRecord.objects.exists())
+        self.assertEqual(sweep(), 0)
+
+
+class StaleJobRecoveryTests(TestCase):
+    """Jobs orphaned by a server restart are failed and their datasets swept."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('restarted')
+        self.long_ago = timezone.now() - timedelta(days=1)
+
+    def upload(self, started_at):
+        dataset = Dataset.objects.create(user=self.user, file='datasets/r.csv', status=Dataset.STATUS_PENDING)
+        job = Job.objects.create(user=self.user, dataset=dataset, kind=Job.KIND_INGEST,
+                                 status=Job.STATUS_RUNNING, started_at=started_at)
+        return dataset, job
+
+    def test_dead_ingest_is_failed_and_swept(self):
+        dataset, job = self.upload(self.long_ago)
+        EquipmentRecord.objects.create(dataset=dataset, equipment_name='E-1', flowrate=1, pressure=1, temperature=1,
+                                       equipment_type=EquipmentType.objects.create(name='Pump'))
+        self.assertEqual(sweep(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.STATUS_FAILED, INTERRUPTED))
+        self.assertFalse(Dataset.objects.filter(pk=dataset.pk).exists())
+        self.assertFalse(EquipmentRecord.objects.exists())
+
+    def test_dead_renders_leave_the_queue(self):
+        dataset = Dataset.objects.create(user=self.user, file='datasets/r.csv')
+        dead = Job.objects.create(user=self.user, dataset=dataset, kind=Job.KIND_REPORT)
+        Job.objects.filter(pk=dead.pk).update(created_at=self.long_ago)
+        queued = Job.objects.create(user=self.user, dataset=dataset, kind=Job.KIND_REPORT)
+        self.assertEqual(list(active_report_jobs()), [queued])
+        dead.refresh_from_db()
+        self.assertEqual((dead.status, dead.error), (Job.STATUS_FAILED, INTERRUPTED))
+
+    def test_dead_deletes_are_swept(self):
+        dead = Dataset.objects.create(user=self.user, file='datasets/r.csv')
+        job = claim_for_deletion(dead, self.user)
+        Job.objects.filter(pk=job.pk).update(created_at=self.long_ago)
+        # Claimed by a sweep before claims came with a job
+        Dataset.objects.create(user=self.user, file='datasets/j.csv', status=Dataset.STATUS_DELETING)
+        live = Dataset.objects.create(user=self.user, file='datasets/l.csv')
+        claim_for_deletion(live, self.user)
+        self.assertEqual(sweep(), 2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.STATUS_FAILED, INTERRUPTED))
+        self.assertFalse(run_deletion(job))  # its worker is not let loose again
+        self.assertEqual(list(Dataset.objects.values_list('id', 'status')), [(live.id, Dataset.STATUS_DELETING)])
+
+    def test_running_ingest_is_left_alone(self):
+        dataset, job = self.upload(timezone.now())
+        self.assertEqual(sweep(), 0)
+        job.refresh_from_db()
+        dataset.refresh_from_db()
+        self.assertEqual((job.status, dataset.status), (Job.STATUS_RUNNING, Dataset.STATUS_PENDING))
+
+
+class DuplicateDatasetTests(TestCase):
+    """An alias never outlives the records of its source."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('twice')
+        self.source = Dataset.objects.create(user=self.user, file='datasets/d.csv')
+        self.alias = Dataset.objects.create(user=self.user, file='datasets/d_2.csv', source=self.source)
+        EquipmentRecord.objects.create(dataset=self.source, equipment_name='E-1', flowrate=1, pressure=1,
+                                       temperature=1, equipment_type=EquipmentType.objects.create(name='Pump'))
+
+    def test_delete_hands_records_to_alias(self):
+        self.source.delete()
+        self.alias.refresh_from_db()
+        self.assertIsNone(self.alias.source)
+        self.assertEqual(self.alias.records.count(), 1)
+
+    def test_bulk_delete_of_source_is_refused(self):
+        with self.assertRaises(RestrictedError):
+            Dataset.objects.filter(pk=self.source.pk).delete()
+        self.assertEqual(Dataset.objects.get(pk=self.alias.pk).source_id, self.source.pk)
+
+    def test_user_delete_takes_source_and_aliases(self):
+        self.user.delete()
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(EquipmentRecord.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class ReportJobTests(TestCase):
+    """POST queues one render job per dataset; the job leaves the report cached."""
+
+    def setUp(self):
+        shutil.rmtree(report_dir(), ignore_errors=True)
+        self.user = User.objects.create_user('render')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dataset = ingested(self.user, 'job.csv', plant_frame(20, seed=4))
+        self.url = f'/api/datasets/{self.dataset.id}/pdf/'
+
+    def test_render_job_fills_the_cache(self):
+        with patch('api.jobs.queue_report') as queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url)
+            self.assertEqual((response.status_code, response.data['status']), (202, Job.STATUS_PENDING))
+            self.assertEqual(self.client.post(self.url).data['id'], response.data['id'])  # still queued: reused
+        queue.assert_called_once()
+        run_report_job(response.data['id'])  # what the render process runs
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], Job.STATUS_DONE)
+        self.assertTrue(job['result_url'].endswith(self.url))
+        self.assertTrue(report_path(self.dataset.id).exists())
+        self.assertEqual(self.client.post(self.url).status_code, 200)
+
+    def test_unready_dataset_is_refused(self):
+        Dataset.objects.filter(pk=self.dataset.pk).update(status=Dataset.STATUS_PENDING)
+        self.assertEqual(self.client.post(self.url).status_code, 409)
+        self.assertEqual(self.client.get(self.url).status_code, 409)
+        self.assertFalse(Job.objects.filter(kind=Job.KIND_REPORT).exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class ReportArchiveTests(TestCase):
+    def setUp(self):
+        shutil.rmtree(report_dir(), ignore_errors=True)
+        user = User.objects.create_user('archivist')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        # Two uploads of plant.csv and one of other.csv, reports of the first two cached
+        self.datasets = [Dataset.objects.create(user=user, file=f'datasets/{name}.csv')
+                         for name in ('plant', 'plant', 'other')]
+        report_dir().mkdir(parents=True)
+        for dataset in self.datasets[:2]:
+            report_path(dataset.id).write_bytes(f'%PDF report {dataset.id}'.encode())
+
+    def archive(self, datasets):
+        response = self.client.get('/api/datasets/reports/', {'ids': ','.join(str(d.id) for d in datasets)})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_members_are_the_cached_reports(self):
+        first, second = self.datasets[:2]
+        archive = self.archive([first, second])
+        self.assertEqual(archive.namelist(), ['plant_report.pdf', f'plant_report_{second.id}.pdf'])
+        self.assertEqual([archive.read(name) for name in archive.namelist()],
+                         [report_path(d.id).read_bytes() for d in (first, second)])
+
+    def test_failed_render_is_listed_in_errors(self):
+        failed = Future()
+        failed.set_exception(RuntimeError('renderer crashed'))
+        with patch('api.report_archive.queue_report', return_value=failed) as queue:
+            archive = self.archive(self.datasets)
+        queue.assert_called_once()
+        self.assertEqual(queue.call_args.args[0].dataset, self.datasets[2])
+        self.assertEqual(archive.namelist()[-1], 'errors.txt')
+        self.assertEqual(archive.read('errors.txt'), b'other_report.pdf: renderer crashed\n')
+        self.assertEqual(len(archive.namelist()), 3)
+
+    def test_bad_id_lists(self):
+        url = '/api/datasets/reports/'
+        Dataset.objects.filter(pk=self.datasets[0].pk).update(status=Dataset.STATUS_PENDING)
+        for ids, code in (('', 400), ('a,b', 400), (f'{self.datasets[2].id + 1}', 404), (f'{self.datasets[0].id}', 409)):
+            self.assertEqual(self.client.get(url, {'ids': ids}).status_code, code, ids)
+
+
+@override_settings(REPORT_QUEUE_LIMIT=2)
+class ReportQueueTests(TestCase):
+    """Every render on a cache miss counts towards REPORT_QUEUE_LIMIT."""
+
+    def setUp(self):
+        user = User.objects.create_user('busy')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.dataset = Dataset.objects.create(user=user, file='datasets/q.csv')
+        for _ in range(2):
+            Job.objects.create(user=user, dataset=self.dataset, kind=Job.KIND_REPORT)
+
+    def test_uncached_download_is_refused_when_full(self):
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/pdf/')
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '5'))
+
+    def test_archive_is_refused_when_full(self):
+        response = self.client.get('/api/datasets/reports/', {'ids': str(self.dataset.id)})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Job.objects.count(), 2)
+
+
+def pdf_page_count(pdf):
+    return int(re.search(rb'/Count (\d+)', pdf).group(1))
+
+
+def pdf_content(pdf):
+    """Every stream of a reportlab PDF (ASCII85 over Flate), decoded and joined."""
+    streams = re.findall(rb'stream\r?\n(.*?)~>\s*endstream', pdf, re.S)
+    return b''.join(zlib.decompress(base64.a85decode(stream)) for stream in streams)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class ReportRenderTests(TestCase):
+    """Reports rendered in process, checked in the PDF's objects and content."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('tables')
+
+    def render(self, rows, **kwargs):
+        dataset = ingested(self.user, f'table{rows}.csv', plant_frame(rows, seed=rows))
+        out = io.BytesIO()
+        render_report(dataset.id, out, **kwargs)
+        return out.getvalue()
+
+    def test_pages_fill_to_capacity(self):
+        # Table pages hold 33 rows, then 34 each
+        for rows, pages in ((1, 2), (33, 2), (34, 3), (67, 3), (68, 4)):
+            self.assertEqual(pdf_page_count(self.render(rows, vector=True)), pages, f'{rows} rows')
+
+    def test_every_row_is_listed_once_across_fetches(self):
+        with patch('api.reports.REPORT_FETCH_ROWS', 7):
+            content = pdf_content(self.render(100, vector=True))
+        names = re.findall(rb'\((E-\d+)\) Tj', content)
+        self.assertEqual(names, [f'E-{i}'.encode() for i in range(100)])
+
+    def test_empty_dataset_has_no_table(self):
+        pdf = self.render(0, vector=True)
+        self.assertEqual(pdf_page_count(pdf), 1)
+        self.assertIn(b'No data records found', pdf_content(pdf))
+
+    def test_page_chrome_is_drawn_from_shared_forms(self):
+        short, long = self.render(100, vector=True), self.render(400, vector=True)
+        forms = len(re.findall(rb'/Subtype /Form', short))
+        self.assertGreater(forms, 0)
+        self.assertEqual(len(re.findall(rb'/Subtype /Form', long)), forms)
+        self.assertGreaterEqual(len(re.findall(rb' Do\b', pdf_content(long))), 2 * pdf_page_count(long))
+
+    def test_vector_charts_embed_no_images(self):
+        raster, vector = self.render(50, vector=False), self.render(50, vector=True)
+        self.assertEqual(len(re.findall(rb'/Subtype /Image', raster)), 2)
+        self.assertNotIn(b'/Subtype /Image', vector)
+        self.assertIn(b'(Process Trends Overview) Tj', pdf_content(vector))
+        self.assertLess(len(vector), len(raster))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA.name)
+class ReportCacheTests(TestCase):
+    """Reports are rendered once per dataset and template version."""
+
+    def setUp(self):
+        shutil.rmtree(report_dir(), ignore_errors=True)  # dataset ids repeat between tests
+        user = User.objects.create_user('reader')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.dataset = ingested(user, 'report.csv', plant_frame(40, seed=3))
+        self.url = f'/api/datasets/{self.dataset.id}/pdf/'
+
+    def test_cached_until_the_template_changes(self):
+        path = get_or_render_report(self.dataset.id)
+        self.assertTrue(path.read_bytes().startswith(b'%PDF'))
+        with patch('api.reports.render_report') as render:
+            self.assertEqual(get_or_render_report(self.dataset.id), path)
+            render.assert_not_called()
+            with patch('api.report_cache.REPORT_TEMPLATE_VERSION', 99):
+                self.assertNotEqual(get_or_render_report(self.dataset.id), path)
+            render.assert_called_once()
+        invalidate_reports(self.dataset.id)
+        self.assertEqual(list(report_dir().glob('*.pdf')), [])
+
+    def test_download_is_conditional(self):
+        get_or_render_report(self.dataset.id)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), report_path(self.dataset.id).read_bytes())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        job = self.client.post(self.url).data
+        self.assertEqual(job['status'], Job.STATUS_DONE)
+        self.assertTrue(job['result_url'].endswith(self.url))
+
+
+class ReportPoolTests(SimpleTestCase):
+    def test_pool_recovers_from_a_dead_render_process(self):
+        with self.assertRaises(BrokenProcessPool):
+            submit_render(os._exit, 1).result()
+        self.assertEqual(submit_render(abs, -3).result(), 3)
+
+
+class ChartTests(SimpleTestCase):
+    """Per-thread template figures give the same PNG however often, and on
+    however many threads, a chart is drawn."""
+
+    def draw(self, seed):
+        rng = np.random.default_rng(seed)
+        x = np.arange(200)
+        trend = trend_chart((x, rng.normal(50, 5, 200)), (x, rng.normal(6, 1, 200)))
+        counts = pd.Series({'Pump': 3 + seed, 'Valve': 5, 'Reactor': 2})
+        breakdown = breakdown_chart(counts, pd.Series({'Pump': 40.0, 'Valve': 12.5 * seed, 'Reactor': 80.0}))
+        return trend.getvalue(), breakdown.getvalue()
+
+    def test_redraws_are_identical(self):
+        first = self.draw(1)
+        self.draw(2)
+        self.assertEqual(self.draw(1), first)
+
+    def test_threads_draw_independently(self):
+        expected = [self.draw(seed) for seed in range(3)]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            drawn = list(pool.map(self.draw, [0, 1, 2, 2, 1, 0]))
+        self.assertEqual(drawn, expected + expected[::-1])
+
+
+class LttbTests(SimpleTestCase):
+    """LTTB buckets cover every point between the first and the last."""
+
+    def test_bucket_edges_end_at_last_point(self):
+        for n in range(4, 400):
+            for threshold in range(3, n):
+                edges = _bucket_edges(n, threshold)
+                self.assertEqual((edges[0], edges[-1]), (1, n - 1), f'n={n} threshold={threshold}')
+                self.assertTrue((np.diff(edges) >= 1).all(), f'n={n} threshold={threshold}')
+
+    def test_keeps_threshold_increasing_indices(self):
+        y = np.random.default_rng(0).normal(size=101)
+        keep = lttb(y, 100)
+        self.assertEqual(len(keep), 100)
+        self.assertEqual((keep[0], keep[-1]), (0, 100))
+        self.assertTrue((np.diff(keep) > 0).all())
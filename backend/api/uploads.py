@@ -0,0 +1,37 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """SHA-256 of every uploaded file, computed while the upload streams in.
+
+    Placed first in ``request.upload_handlers`` it sees each chunk, passes it
+    on unchanged to the handlers that store the file and keeps the digest per
+    form field in ``hashes``; the file never has to be read a second time.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hashes = {}
+        self._sha256 = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.hashes[self.field_name] = self._sha256.hexdigest()
+        return None  # let the next handler build the file
+
+
+def uploaded_file_hash(request, field_name):
+    """Digest recorded by the request's HashingUploadHandler, if it has one."""
+    for handler in request.upload_handlers:
+        if isinstance(handler, HashingUploadHandler):
+            return handler.hashes.get(field_name)
+    return None
@@ -1,15 +1,24 @@
 from django.urls import path
 from .views import (DatasetUploadView, DatasetListView, GlobalDatasetListView, 
-                    DatasetRecordsView, DatasetStatsView, DatasetPDFView, UserRegistrationView)
+                    DatasetRecordsView, DatasetStatsView, DatasetPDFView, UserRegistrationView,
+                    JobDetailView, DatasetSeriesView, DatasetReportArchiveView, DatasetDetailView,
+                    DatasetCorrelationView, DatasetHistogramView, DatasetCompareView)
 from rest_framework.authtoken import views
 
 urlpatterns = [
     path('upload/', DatasetUploadView.as_view(), name='dataset-upload'),
     path('datasets/', DatasetListView.as_view(), name='dataset-list'),
     path('global-datasets/', GlobalDatasetListView.as_view(), name='global-dataset-list'),
+    path('datasets/reports/', DatasetReportArchiveView.as_view(), name='dataset-report-archive'),
+    path('datasets/compare/', DatasetCompareView.as_view(), name='dataset-compare'),
+    path('datasets/<int:id>/', DatasetDetailView.as_view(), name='dataset-detail'),
     path('datasets/<int:id>/data/', DatasetRecordsView.as_view(), name='dataset-records'),
     path('datasets/<int:id>/stats/', DatasetStatsView.as_view(), name='dataset-stats'),
+    path('datasets/<int:id>/correlation/', DatasetCorrelationView.as_view(), name='dataset-correlation'),
+    path('datasets/<int:id>/histogram/', DatasetHistogramView.as_view(), name='dataset-histogram'),
+    path('datasets/<int:id>/series/', DatasetSeriesView.as_view(), name='dataset-series'),
     path('datasets/<int:id>/pdf/', DatasetPDFView.as_view(), name='dataset-pdf'),
+    path('jobs/<int:id>/', JobDetailView.as_view(), name='job-detail'),
     path('api-token-auth/', views.obtain_auth_token),
     path('auth/registration/', UserRegistrationView.as_view(), name='user-registration'),
 ]
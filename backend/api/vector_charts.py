@@ -0,0 +1,119 @@
+"""Report charts as reportlab vector drawings.
+
+Counterparts of the PNG charts in :mod:`api.charts` that are drawn straight
+onto the PDF canvas: no rasterizing or PNG encoding, smaller files and output
+that stays sharp at any zoom. Each function returns a
+:class:`~reportlab.graphics.shapes.Drawing` of the given size in points.
+"""
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.doughnut import Doughnut
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+
+TEAL = colors.HexColor('#0d9488')
+TEAL_FILL = TEAL.clone(alpha=0.1)
+AMBER = colors.HexColor('#f59e0b')
+TITLE = colors.HexColor('#333333')
+GRID = colors.HexColor('#e5e7eb')
+DONUT_COLORS = [colors.HexColor(c) for c in ('#0f766e', '#0d9488', '#14b8a6', '#2dd4bf', '#5eead4')]
+
+
+def _title(drawing, x, text, size):
+    drawing.add(String(x, drawing.height - size - 2, text, fontName='Helvetica-Bold',
+                       fontSize=size, fillColor=TITLE, textAnchor='middle'))
+
+
+def _grid(axis):
+    axis.visibleGrid = True
+    axis.gridStrokeColor = GRID
+    axis.gridStrokeWidth = 0.5
+    axis.visibleAxis = False
+    axis.visibleTicks = False
+    axis.labels.fontName = 'Helvetica'
+    axis.labels.fontSize = 7
+
+
+def trend_drawing(flowrate, pressure, width, height):
+    """Flowrate/pressure trend; each series is an ``(x, y)`` pair of arrays."""
+    d = Drawing(width, height)
+    _title(d, width / 2, 'Process Trends Overview', 10)
+
+    plot = LinePlot()
+    plot.x, plot.y = 36, 18
+    plot.width, plot.height = width - 48, height - 48
+    plot.data = [list(zip(x.tolist(), y.tolist())) for x, y in (flowrate, pressure)]
+    plot.joinedLines = 1
+    plot.lines[0].strokeColor = TEAL
+    plot.lines[0].strokeWidth = 1
+    plot.lines[0].inFill = 1
+    plot.lines[0].fillColor = TEAL_FILL
+    plot.lines[1].strokeColor = AMBER
+    plot.lines[1].strokeWidth = 1
+    plot.lines[1].strokeDashArray = [4, 2]
+    plot.xValueAxis.valueMin = float(min(flowrate[0][0], pressure[0][0]))
+    plot.xValueAxis.valueMax = float(max(flowrate[0][-1], pressure[0][-1]))
+    _grid(plot.xValueAxis)
+    _grid(plot.yValueAxis)
+    d.add(plot)
+
+    legend = Legend()
+    legend.x, legend.y = width - 110, height - 24
+    legend.alignment = 'right'
+    legend.columnMaximum = 1
+    legend.fontName = 'Helvetica'
+    legend.fontSize = 7
+    legend.colorNamePairs = [(TEAL, 'Flowrate'), (AMBER, 'Pressure')]
+    d.add(legend)
+
+    d.add(String(8, 18 + plot.height / 2, 'Value', fontName='Helvetica', fontSize=7, fillColor=TITLE))
+    return d
+
+
+def breakdown_drawing(type_counts, type_flowrate, width, height):
+    """Equipment donut next to the average-flowrate bars.
+
+    ``type_counts`` and ``type_flowrate`` are pandas Series indexed by type.
+    """
+    d = Drawing(width, height)
+    half = width / 2
+    _title(d, half / 2, 'Equipment Distribution', 9)
+    _title(d, half + half / 2, 'Avg Flowrate by Type', 9)
+
+    total = float(type_counts.sum())
+    donut = Doughnut()
+    size = min(half, height) - 44
+    donut.x, donut.y = (half - size) / 2, 14
+    donut.width = donut.height = size
+    donut.data = type_counts.tolist()
+    donut.labels = [f'{t} {c / total:.1%}' for t, c in type_counts.items()]
+    donut.innerRadiusFraction = 0.7
+    donut.startAngle = 90
+    donut.direction = 'anticlockwise'
+    donut.slices.strokeColor = colors.white
+    donut.slices.fontName = 'Helvetica'
+    donut.slices.fontSize = 6
+    for i in range(len(type_counts)):
+        donut.slices[i].fillColor = DONUT_COLORS[i % len(DONUT_COLORS)]
+    d.add(donut)
+
+    bars = VerticalBarChart()
+    bars.x, bars.y = half + 30, 36
+    bars.width, bars.height = half - 44, height - 62
+    bars.data = [type_flowrate.tolist()]
+    bars.bars[0].fillColor = TEAL
+    bars.bars[0].strokeColor = None
+    bars.barWidth = 6
+    bars.groupSpacing = 4
+    bars.categoryAxis.categoryNames = [str(t) for t in type_flowrate.index]
+    bars.categoryAxis.labels.angle = 45
+    bars.categoryAxis.labels.boxAnchor = 'ne'
+    bars.categoryAxis.labels.fontName = 'Helvetica'
+    bars.categoryAxis.labels.fontSize = 7
+    bars.categoryAxis.visibleTicks = False
+    bars.categoryAxis.strokeColor = GRID
+    bars.valueAxis.valueMin = 0
+    _grid(bars.valueAxis)
+    d.add(bars)
+    return d
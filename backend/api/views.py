@@ -3,16 +3,43 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date
 
-from .models import Dataset, EquipmentRecord
-from .serializers import DatasetSerializer, EquipmentRecordSerializer
+from .models import Dataset, EquipmentRecord, Job, resolve_data_id
+from .serializers import DatasetSerializer, EquipmentRecordSerializer, JobSerializer
+from .ingest import validate_header
+from .uploads import HashingUploadHandler, uploaded_file_hash
+from .deletion import claim_for_deletion
+from .jobs import (active_report_jobs, render_report_bounded, schedule_sweep, submit_delete, submit_ingest,
+                   submit_report)
+from .summary import METRICS, get_summary
+from .correlation import get_correlation
+from .compare import compare_datasets
+from .histogram import DEFAULT_BINS, MAX_BINS, get_histogram
+from .quantiles import MAX_QUANTILES, QUANTILES, get_sketches, quantile_table
+from .analytics import downsample, metric_column, store_columns
+from .pagination import RecordCursorPagination
+from .renderers import NDJSONRenderer, ColumnarRenderer
+from .columnar import encode_columns, encode_queryset
+from .reports import report_filename
+from .report_archive import stream_reports_zip
+from .report_cache import REPORT_TEMPLATE_VERSION, report_path
+from .streaming import stream_json, stream_ndjson
 
-import pandas as pd
-from reportlab.pdfgen import canvas
-import io
+SERIES_POINTS = 1000
+MAX_SERIES_POINTS = 10000
+MAX_ARCHIVE_DATASETS = 50
+MAX_COMPARE_DATASETS = 20
+RECORD_FIELDS = ['id', 'dataset', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
 
 class UserRegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -44,34 +71,44 @@ class DatasetUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [permissions.IsAuthenticated]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Hash the upload as it streams in (handlers must be set before parsing)
+        request.upload_handlers.insert(0, HashingUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
     def post(self, request, *args, **kwargs):
         file_serializer = DatasetSerializer(data=request.data)
         if file_serializer.is_valid():
-            # Attach user
-            dataset = file_serializer.save(user=request.user)
+            content_hash = uploaded_file_hash(request, 'file') or ''
             
+            # Identical file already ingested by this user: reuse its records and summary
+            # (the user's own, so deleting the user takes original and aliases together)
+            original = (Dataset.objects.filter(user=request.user, content_hash=content_hash,
+                                               status=Dataset.STATUS_READY,
+                                               source__isnull=True).order_by('id').first()
+                        if content_hash else None)
+            if original is not None:
+                dataset = file_serializer.save(user=request.user, status=Dataset.STATUS_READY,
+                                               content_hash=content_hash, source=original)
+                transaction.on_commit(schedule_sweep)
+                return Response(DatasetSerializer(dataset).data, status=status.HTTP_201_CREATED)
             
-            # Process CSV
+            # Attach user
+            dataset = file_serializer.save(user=request.user, status=Dataset.STATUS_PENDING,
+                                           content_hash=content_hash)
+            
+            # Expected columns: "Equipment Name,Type,Flowrate,Pressure,Temperature"
             try:
-                df = pd.read_csv(dataset.file.path)
-                # Expected columns: "Equipment Name,Type,Flowrate,Pressure,Temperature"
-                
-                records = []
-                for _, row in df.iterrows():
-                    records.append(EquipmentRecord(
-                        dataset=dataset,
-                        equipment_name=row['Equipment Name'],
-                        equipment_type=row['Type'],
-                        flowrate=row['Flowrate'],
-                        pressure=row['Pressure'],
-                        temperature=row['Temperature']
-                    ))
-                EquipmentRecord.objects.bulk_create(records)
-                
-                return Response(file_serializer.data, status=status.HTTP_201_CREATED)
+                validate_header(dataset.file.path)
             except Exception as e:
+                dataset.file.delete()
                 dataset.delete()
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Rows are parsed and inserted in the background; poll /api/jobs/<job>/
+            job = submit_ingest(dataset)
+            data = dict(DatasetSerializer(dataset).data, job=job.id)
+            return Response(data, status=status.HTTP_202_ACCEPTED)
         return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class DatasetListView(generics.ListAPIView):
@@ -79,316 +116,318 @@ class DatasetListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Dataset.objects.filter(user=self.request.user).order_by('-uploaded_at')
+        return (Dataset.objects.filter(user=self.request.user).exclude(status=Dataset.STATUS_DELETING)
+                .order_by('-uploaded_at'))
 
 class GlobalDatasetListView(generics.ListAPIView):
-    queryset = Dataset.objects.all().order_by('-uploaded_at')
+    queryset = Dataset.objects.exclude(status=Dataset.STATUS_DELETING).order_by('-uploaded_at')
     serializer_class = DatasetSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+class DatasetDetailView(APIView):
+    """``DELETE``: remove one of your datasets.
+
+    Answers ``202`` with a ``delete`` job right away; the dataset drops out of
+    listings immediately while its records are deleted in chunks in the
+    background (``rows_processed`` counts them).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def delete(self, request, id):
+        dataset = get_object_or_404(Dataset, id=id, user=request.user)
+        job = claim_for_deletion(dataset, request.user)
+        if job is None:
+            return Response({"error": f"Dataset is {dataset.status}"}, status=status.HTTP_409_CONFLICT)
+        submit_delete(job)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+class JobDetailView(generics.RetrieveAPIView):
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_field = 'id'
+    
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
 class DatasetRecordsView(generics.ListAPIView):
+    """Records of a dataset.
+
+    Unpaginated by default; pass ``?limit=`` (and then the returned ``next``
+    cursor) for keyset pagination, and ``?fields=id,flowrate`` to project columns.
+    ``?format=ndjson`` or ``?stream=true`` skip the serializer and stream every
+    row as NDJSON / a JSON array; ``?format=columns`` (or the matching Accept
+    header) returns the columnar binary layout described in ``api.columnar``.
+    Those exports always hold every record and refuse ``limit``/``cursor``.
+    """
     serializer_class = EquipmentRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = None
+    pagination_class = RecordCursorPagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer, ColumnarRenderer]
+    
+    def get_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = set(fields) - set(RECORD_FIELDS)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return fields
     
     def get_queryset(self):
-        dataset_id = self.kwargs['id']
-        return EquipmentRecord.objects.filter(dataset_id=dataset_id)
+        dataset_id = resolve_data_id(self.kwargs['id'])
+        queryset = EquipmentRecord.objects.filter(dataset_id=dataset_id).order_by('id')
+        fields = self.get_fields()
+        if fields:
+            queryset = queryset.only(*fields)
+        if not fields or 'equipment_type' in fields:
+            queryset = queryset.select_related('equipment_type')
+        return queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = self.get_fields()
+        return super().get_serializer(*args, **kwargs)
+    
+    def list(self, request, *args, **kwargs):
+        # Fast paths: rows go from values_list() straight to the socket
+        fields = self.get_fields() or RECORD_FIELDS
+        streamed = request.query_params.get('stream', '').lower() in ('1', 'true', 'json')
+        full_export = streamed or request.accepted_renderer.format in (NDJSONRenderer.format, ColumnarRenderer.format)
+        if full_export and {'limit', 'cursor'} & request.query_params.keys():
+            return Response({"error": "Streamed and columnar exports return every record: "
+                                      "drop limit and cursor, or page through the JSON list"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return stream_ndjson(self.get_queryset(), fields)
+        if request.accepted_renderer.format == ColumnarRenderer.format:
+            # Metric/type projections come straight from the dataset's column store
+            columns = store_columns(resolve_data_id(self.kwargs['id']), fields)
+            body = encode_columns(columns) if columns is not None else encode_queryset(self.get_queryset(), fields)
+            return HttpResponse(body, content_type=ColumnarRenderer.media_type)
+        if streamed:
+            return stream_json(self.get_queryset(), fields)
+        return super().list(request, *args, **kwargs)
 
 class DatasetStatsView(APIView):
+    """Summary statistics; ``quantiles`` holds approximate p50/p95/p99 (or the
+    ``?quantiles=0.5,0.9`` asked for) of every metric, overall and per type."""
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, id):
-        records = EquipmentRecord.objects.filter(dataset_id=id)
-        if not records.exists():
+        param = request.query_params.get('quantiles')
+        try:
+            qs = [float(q) for q in param.split(',')] if param else QUANTILES
+        except ValueError:
+            qs = []
+        if not 1 <= len(qs) <= MAX_QUANTILES or not all(0 < q < 1 for q in qs):
+            return Response({"error": f"quantiles must be 1 to {MAX_QUANTILES} values between 0 and 1"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Precomputed at ingest time: O(1) regardless of dataset size
+        summary = get_summary(resolve_data_id(id))
+        if summary is None or summary.total_count == 0:
              return Response({"error": "Dataset not found or empty"}, status=404)
         
-        total_count = records.count()
-        avg_flow = records.aggregate(Avg('flowrate'))['flowrate__avg']
-        avg_press = records.aggregate(Avg('pressure'))['pressure__avg']
-        avg_temp = records.aggregate(Avg('temperature'))['temperature__avg']
-        
-        type_dist = records.values('equipment_type').annotate(count=Count('equipment_type'))
-        dist_dict = {item['equipment_type']: item['count'] for item in type_dist}
-        
         return Response({
-            "total_count": total_count,
-            "average_flowrate": avg_flow,
-            "average_pressure": avg_press,
-            "average_temperature": avg_temp,
-            "type_distribution": dist_dict
+            "total_count": summary.total_count,
+            "average_flowrate": summary.metrics['flowrate']['mean'],
+            "average_pressure": summary.metrics['pressure']['mean'],
+            "average_temperature": summary.metrics['temperature']['mean'],
+            "type_distribution": summary.type_distribution,
+            # {"flowrate": {"mean", "min", "max", "std"}, ...}
+            "metrics": summary.metrics,
+            # {"Pump": {"flowrate", "pressure", "temperature"}, ...}
+            "type_means": summary.type_means,
+            # t-digest estimates: {"rank_error": {"p99": ...}, "metrics": {...}, "by_type": {"Pump": {...}}}
+            "quantiles": quantile_table(get_sketches(summary), qs),
         })
 
-from reportlab.lib.utils import ImageReader
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+class DatasetCorrelationView(APIView):
+    """Pearson and Spearman matrices (rows and columns in ``metrics`` order) and
+    linear fits for every ordered metric pair; ``?by_type=true`` adds the same
+    per equipment type. Computed once per dataset, then served from cache."""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, id):
+        summary = get_summary(resolve_data_id(id))
+        if summary is None or summary.total_count == 0:
+             return Response({"error": "Dataset not found or empty"}, status=404)
 
-class DatasetPDFView(APIView):
+        correlation = get_correlation(summary)
+        data = {"metrics": METRICS, **correlation}
+        if request.query_params.get('by_type', '').lower() not in ('1', 'true'):
+            del data['by_type']
+        return Response(data)
+
+class DatasetHistogramView(APIView):
+    """Binned counts over each metric's min..max: ``?x=flowrate&bins=40`` is a
+    histogram; adding ``y`` (``?x=pressure&y=temperature&bins=40,30``) returns
+    the grid ``counts[i][j]`` of x bin i and y bin j with both marginals.
+    The payload depends on the bin count only; cached per dataset."""
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, id):
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer)
-        width, height = 595.27, 841.89 # A4 Size
+        x = request.query_params.get('x', '')
+        y = request.query_params.get('y') or None
+        if x not in METRICS or y not in METRICS + [None]:
+            return Response({"error": f"x and y must be one of: {', '.join(METRICS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            bins = [int(b) for b in request.query_params.get('bins', str(DEFAULT_BINS)).split(',')]
+        except ValueError:
+            bins = []
+        if len(bins) == 1:
+            bins *= 2
+        if len(bins) != 2 or not all(1 <= b <= MAX_BINS for b in bins):
+            return Response({"error": f"bins must be one or two counts between 1 and {MAX_BINS}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # --- COLORS & FONTS ---
-        TEAL_MAIN = (0.05, 0.58, 0.53) # #0d9488
-        TEAL_DARK = (0.0, 0.3, 0.28) 
-        TEAL_LIGHT = (0.94, 0.99, 0.98) # #f0fdfa
-        GRAY_TEXT = (0.2, 0.2, 0.2)
-        GRAY_SUB = (0.5, 0.5, 0.5)
-        GRAY_LINE = (0.9, 0.9, 0.9)
-        
-        # --- HEADER ---
-        # Draw top banner
-        p.setFillColorRGB(*TEAL_MAIN)
-        p.rect(0, height - 80, width, 80, fill=1, stroke=0)
+        summary = get_summary(resolve_data_id(id))
+        if summary is None or summary.total_count == 0:
+             return Response({"error": "Dataset not found or empty"}, status=404)
+        return Response({"count": summary.total_count, **get_histogram(summary, x, bins[0], y, bins[1] if y else None)})
+
+class DatasetSeriesView(APIView):
+    """Downsampled trend series: ``?metric=flowrate,pressure&points=1000``.
+
+    Each metric is reduced with LTTB to at most ``points`` (x, y) pairs, x being
+    the row position, so chart payloads stay bounded whatever the dataset size.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, id):
+        metrics = [m.strip() for m in request.query_params.get('metric', 'flowrate').split(',') if m.strip()]
+        unknown = set(metrics) - set(METRICS)
+        if unknown or not metrics:
+            return Response({"error": f"metric must be one of: {', '.join(METRICS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            points = int(request.query_params.get('points', SERIES_POINTS))
+        except ValueError:
+            points = -1
+        if not 3 <= points <= MAX_SERIES_POINTS:
+            return Response({"error": f"points must be between 3 and {MAX_SERIES_POINTS}"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Logo placeholder (Text for now)
-        p.setFont("Helvetica-Bold", 28)
-        p.setFillColorRGB(1, 1, 1)
-        p.drawString(40, height - 50, "ChemViz")
+        dataset = get_object_or_404(Dataset, id=id)
+        if dataset.status != Dataset.STATUS_READY:
+            return Response({"error": f"Dataset is {dataset.status}"}, status=status.HTTP_409_CONFLICT)
         
-        p.setFont("Helvetica", 12)
-        p.drawString(40, height - 68, "Advanced Chemical Process Analytics")
-
-        # Report Info (Right aligned)
-        from datetime import datetime
-        p.setFont("Helvetica-Bold", 14)
-        p.drawRightString(width - 40, height - 45, "ANALYTICAL REPORT")
+        series = {}
+        total = 0
+        for metric in metrics:
+            y = metric_column(dataset.data_id, metric)
+            total = len(y)
+            x, y = downsample(y, points)
+            series[metric] = {"x": x.tolist(), "y": y.tolist()}
         
-        p.setFont("Helvetica", 9)
-        p.drawRightString(width - 40, height - 62, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        p.drawRightString(width - 40, height - 74, f"Dataset ID: #{id}")
+        return Response({"total": total, "points": points, "series": series})
 
-        # --- FOOTER HELPER ---
-        def draw_footer(canvas, page_num):
-            canvas.saveState()
-            canvas.setStrokeColorRGB(*GRAY_LINE)
-            canvas.line(40, 40, width - 40, 40)
-            canvas.setFont("Helvetica", 8)
-            canvas.setFillColorRGB(*GRAY_SUB)
-            canvas.drawString(40, 25, "ChemViz Analytics Platform • Confidential Report")
-            canvas.drawRightString(width - 40, 25, f"Page {page_num}")
-            canvas.restoreState()
+def report_queue_full():
+    """429 for a render refused because REPORT_QUEUE_LIMIT renders are queued or running."""
+    response = Response({"error": "Too many reports are being rendered, try again shortly"},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = '5'
+    return response
 
-        # --- CONTENT ---
-        records = EquipmentRecord.objects.filter(dataset_id=id)
-        total = records.count()
+class DatasetPDFView(APIView):
+    """GET downloads the report (rendered on a cache miss); POST queues the
+    render on the background render pool and returns a job to poll."""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, id):
+        dataset = get_object_or_404(Dataset, id=id)
+        if dataset.status != Dataset.STATUS_READY:
+            # Never cache a report of a half-ingested dataset
+            return Response({"error": f"Dataset is {dataset.status}"}, status=status.HTTP_409_CONFLICT)
+        path = report_path(id)
+        if not path.exists():
+            if active_report_jobs().count() >= settings.REPORT_QUEUE_LIMIT:
+                return report_queue_full()
+            error = render_report_bounded(dataset, request.user)
+            if error:
+                return Response({"error": error}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        if total > 0:
-            avg_flow = records.aggregate(Avg('flowrate'))['flowrate__avg']
-            avg_press = records.aggregate(Avg('pressure'))['pressure__avg']
-            avg_temp = records.aggregate(Avg('temperature'))['temperature__avg']
-            
-            y_pos = height - 120
-            
-            # Title Section
-            p.setFont("Helvetica-Bold", 16)
-            p.setFillColorRGB(*GRAY_TEXT)
-            p.drawString(40, y_pos, "Executive Summary")
-            y_pos -= 10
-            
-            # --- KPI CARDS ---
-            card_y = y_pos - 70
-            card_width = 120
-            card_height = 60
-            gap = 15
-            
-            def draw_stat_box(x, title, value, unit, icon_color=(0.9, 0.9, 0.9)):
-                # Shadow effect
-                p.setFillColorRGB(0.95, 0.95, 0.95)
-                p.roundRect(x+2, card_y-2, card_width, card_height, 6, fill=1, stroke=0)
-                # Main box
-                p.setFillColorRGB(1, 1, 1)
-                p.setStrokeColorRGB(0.9, 0.9, 0.9)
-                p.roundRect(x, card_y, card_width, card_height, 6, fill=1, stroke=1)
-                
-                # Title
-                p.setFont("Helvetica", 9)
-                p.setFillColorRGB(*GRAY_SUB)
-                p.drawString(x + 12, card_y + 42, title)
-                
-                # Value
-                p.setFont("Helvetica-Bold", 18)
-                p.setFillColorRGB(*TEAL_MAIN)
-                p.drawString(x + 12, card_y + 18, str(value))
-                
-                # Unit
-                if unit:
-                    p.setFont("Helvetica-Bold", 9)
-                    p.setFillColorRGB(*GRAY_SUB)
-                    p.drawRightString(x + card_width - 12, card_y + 20, unit)
-
-            draw_stat_box(40, "Total Records", str(total), "")
-            draw_stat_box(40 + card_width + gap, "Avg Flowrate", f"{avg_flow:.1f}", "L/min")
-            draw_stat_box(40 + 2*(card_width + gap), "Avg Pressure", f"{avg_press:.1f}", "PSI")
-            draw_stat_box(40 + 3*(card_width + gap), "Avg Temp", f"{avg_temp:.1f}", "°C")
-
-            # --- GRAPHS ---
-            y_pos = card_y - 30
-            
-            df = pd.DataFrame(list(records.values('flowrate', 'pressure', 'temperature', 'equipment_type')))
-            
-            # Matplotlib Aesthetic Setup
-            plt.style.use('seaborn-v0_8-whitegrid')
-            
-            # 1. Trend Chart
-            fig, ax = plt.subplots(figsize=(8, 3.5))
-            ax.plot(df.index, df['flowrate'], label='Flowrate', color='#0d9488', linewidth=1.5, alpha=0.9)
-            ax.fill_between(df.index, df['flowrate'], color='#0d9488', alpha=0.1)
-            ax.plot(df.index, df['pressure'], label='Pressure', color='#f59e0b', linestyle='--', linewidth=1.5)
-            
-            ax.set_title('Process Trends Overview', fontsize=12, pad=10, fontweight='bold', color='#333333')
-            ax.legend(frameon=True, fontsize=9)
-            ax.set_ylabel('Value', fontsize=9)
-            ax.tick_params(axis='both', which='major', labelsize=8)
-            ax.margins(x=0)
-            
-            for spine in ax.spines.values():
-                spine.set_visible(False)
-            
-            plt.tight_layout()
-            
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            graph_height = 180
-            p.drawImage(ImageReader(img_buffer), 35, y_pos - graph_height, width=520, height=graph_height)
-            plt.close()
-            
-            y_pos -= (graph_height + 30)
-
-            # 2. Side-by-Side: Distribution + Bar
-            # Distribution
-            fig2, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 3.5))
-            
-            counts = df['equipment_type'].value_counts()
-            colors = ['#0f766e', '#0d9488', '#14b8a6', '#2dd4bf', '#5eead4']
-            ax1.pie(counts, labels=counts.index, autopct='%1.1f%%', colors=colors[:len(counts)], 
-                   textprops={'fontsize': 8}, startangle=90, pctdistance=0.85)
-            # Draw circle for donut chart
-            centre_circle = plt.Circle((0,0),0.70,fc='white')
-            ax1.add_artist(centre_circle)
-            ax1.set_title('Equipment Distribution', fontsize=10, fontweight='bold')
-            
-            # Bar Chart (Avg Flow per Type)
-            avg_by_type = df.groupby('equipment_type')['flowrate'].mean()
-            ax2.bar(avg_by_type.index, avg_by_type.values, color='#0d9488', alpha=0.8, width=0.6)
-            ax2.set_title('Avg Flowrate by Type', fontsize=10, fontweight='bold')
-            ax2.tick_params(axis='x', rotation=45, labelsize=8)
-            ax2.grid(axis='y', linestyle='--', alpha=0.5)
-            for spine in ax2.spines.values():
-                spine.set_visible(False)
-            
-            plt.tight_layout()
-            img_buffer2 = io.BytesIO()
-            plt.savefig(img_buffer2, format='png', dpi=150, bbox_inches='tight')
-            img_buffer2.seek(0)
-            
-            graph_height_2 = 160
-            p.drawImage(ImageReader(img_buffer2), 35, y_pos - graph_height_2, width=520, height=graph_height_2)
-            plt.close()
-
-            draw_footer(p, 1)
-            p.showPage()
-            
-            # --- PAGE 2: TABLE ---
-            # Header on new page
-            p.setFillColorRGB(*TEAL_MAIN)
-            p.rect(0, height - 60, width, 60, fill=1, stroke=0)
-            p.setFont("Helvetica-Bold", 18)
-            p.setFillColorRGB(1, 1, 1)
-            p.drawString(40, height - 40, "Detailed Equipment Logs")
-            
-            y = height - 100
-            
-            # Table Schema
-            cols = [
-                {"name": "Equipment Name", "x": 40, "w": 180},
-                {"name": "Type", "x": 220, "w": 100},
-                {"name": "Flow (L/min)", "x": 320, "w": 80},
-                {"name": "Press (PSI)", "x": 400, "w": 80},
-                {"name": "Temp (°C)", "x": 480, "w": 80},
-            ]
-            
-            # Draw Header Row
-            p.setFillColorRGB(*TEAL_MAIN)
-            p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
-            p.setFillColorRGB(1, 1, 1)
-            p.setFont("Helvetica-Bold", 9)
-            
-            for col in cols:
-                p.drawString(col["x"] + 10, y + 2, col["name"])
-            
-            y -= 25
-            page_num = 2
-            
-            p.setFont("Helvetica", 9)
-            p.setFillColorRGB(*GRAY_TEXT)
-            
-            for index, record in enumerate(records):
-                if y < 60:
-                    draw_footer(p, page_num)
-                    p.showPage()
-                    page_num += 1
-                    
-                    # Re-draw header on new page
-                    p.setFillColorRGB(*TEAL_MAIN)
-                    p.rect(0, height - 40, width, 40, fill=1, stroke=0)
-                    p.setFont("Helvetica-Bold", 14)
-                    p.setFillColorRGB(1, 1, 1)
-                    p.drawString(40, height - 28, "Detailed Equipment Logs (Cont.)")
-                    
-                    y = height - 80
-                    p.setFillColorRGB(*TEAL_MAIN)
-                    p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
-                    p.setFillColorRGB(1, 1, 1)
-                    p.setFont("Helvetica-Bold", 9)
-                    for col in cols:
-                        p.drawString(col["x"] + 10, y + 2, col["name"])
-                    y -= 25
-                    p.setFont("Helvetica", 9)
-
-                # Row Background
-                if index % 2 == 0:
-                    p.setFillColorRGB(*TEAL_LIGHT)
-                    p.rect(40, y - 6, 515, 18, fill=1, stroke=0)
-                
-                # Cell Content
-                p.setFillColorRGB(*GRAY_TEXT)
-                p.drawString(cols[0]["x"] + 10, y, str(record.equipment_name)[:28])
-                p.drawString(cols[1]["x"] + 10, y, str(record.equipment_type))
-                p.drawString(cols[2]["x"] + 10, y, f"{record.flowrate:.1f}")
-                p.drawString(cols[3]["x"] + 10, y, f"{record.pressure:.1f}")
-                
-                # Conditional color for Temp
-                if record.temperature > 100:
-                    p.setFillColorRGB(0.8, 0.2, 0.2)
-                    p.setFont("Helvetica-Bold", 9)
-                p.drawString(cols[4]["x"] + 10, y, f"{record.temperature:.1f}")
-                
-                if record.temperature > 100:
-                    p.setFillColorRGB(*GRAY_TEXT)
-                    p.setFont("Helvetica", 9)
+        # Cached reports are immutable: honour If-None-Match / If-Modified-Since
+        mtime = path.stat().st_mtime
+        etag = f'"{id}-v{REPORT_TEMPLATE_VERSION}-{int(mtime)}"'
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+        if not_modified is not None:
+            return not_modified
+        
+        response = FileResponse(open(path, 'rb'), content_type='application/pdf',
+                                as_attachment=True, filename=report_filename(dataset))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        return response
+    
+    def post(self, request, id):
+        dataset = get_object_or_404(Dataset, id=id)
+        if dataset.status != Dataset.STATUS_READY:
+            return Response({"error": f"Dataset is {dataset.status}"}, status=status.HTTP_409_CONFLICT)
+        
+        if report_path(id).exists():
+            job = Job.objects.create(user=request.user, dataset=dataset, kind=Job.KIND_REPORT,
+                                     status=Job.STATUS_DONE, finished_at=timezone.now())
+            return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_200_OK)
+        
+        if active_report_jobs().count() >= settings.REPORT_QUEUE_LIMIT:
+            return report_queue_full()
+        
+        job = submit_report(dataset, request.user)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
 
-                y -= 20
-                
-            draw_footer(p, page_num)
+def requested_datasets(request, limit):
+    """The ready datasets of ``?ids=1,2,3`` in the order given (repeats
+    dropped), or the error Response to return instead."""
+    try:
+        ids = list(dict.fromkeys(int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        ids = []
+    if not 1 <= len(ids) <= limit:
+        return Response({"error": f"ids must list 1 to {limit} dataset ids"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    datasets = Dataset.objects.in_bulk(ids)
+    missing = [i for i in ids if i not in datasets]
+    if missing:
+        return Response({"error": f"Datasets not found: {', '.join(map(str, missing))}"},
+                        status=status.HTTP_404_NOT_FOUND)
+    not_ready = [i for i in ids if datasets[i].status != Dataset.STATUS_READY]
+    if not_ready:
+        return Response({"error": f"Datasets not ready: {', '.join(map(str, not_ready))}"},
+                        status=status.HTTP_409_CONFLICT)
+    return [datasets[i] for i in ids]
 
-        else:
-            p.setFont("Helvetica", 12)
-            p.drawString(40, height - 150, "No data records found in this dataset.")
+class DatasetReportArchiveView(APIView):
+    """Reports of several datasets as one ZIP: ``?ids=1,2,3``.
 
-        p.showPage()
-        p.save()
-        buffer.seek(0)
+    The archive is streamed as it is built, so the download starts with the
+    cached reports while the missing ones are still rendering.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        datasets = requested_datasets(request, MAX_ARCHIVE_DATASETS)
+        if isinstance(datasets, Response):
+            return datasets
         
-        # Get filename
-        dataset = Dataset.objects.get(id=id)
-        original_filename = dataset.file.name.split('/')[-1]
-        pdf_filename = original_filename.rsplit('.', 1)[0] + '_report.pdf'
+        # Missing reports render as report jobs, no more at a time than the queue has room for
+        slots = settings.REPORT_QUEUE_LIMIT - active_report_jobs().count()
+        if slots <= 0 and not all(report_path(dataset.id).exists() for dataset in datasets):
+            return report_queue_full()
         
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{pdf_filename}"'
+        response = StreamingHttpResponse(stream_reports_zip(datasets, request.user, slots),
+                                         content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="ChemViz_Reports.zip"'
         return response
+
+class DatasetCompareView(APIView):
+    """Datasets side by side: ``?ids=5,4,3`` (the first is the baseline).
+
+    Each entry carries the dataset's statistics and approximate quantiles;
+    every entry after the first adds ``changes``, the delta and percentage
+    change of each of those numbers (per type included) against the baseline.
+    ``quantiles`` covers all the datasets' rows together. Served from the
+    precomputed summaries, so it costs the same for 1k or 1M rows per dataset.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        datasets = requested_datasets(request, MAX_COMPARE_DATASETS)
+        if isinstance(datasets, Response):
+            return datasets
+
+        comparison = compare_datasets(datasets)
+        comparison['datasets'] = [
+            {**DatasetSerializer(dataset, context={'request': request}).data, **entry}
+            for dataset, entry in zip(datasets, comparison['datasets'])
+        ]
+        return Response({"baseline": datasets[0].id, "metrics": METRICS, **comparison})
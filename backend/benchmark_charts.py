@@ -0,0 +1,41 @@
+"""Report chart throughput with 1, 4 and 8 threads.
+
+Renders the two report charts (trend + breakdown) from synthetic data and
+checks that every threaded render is byte-identical to a single-threaded one.
+
+    python benchmark_charts.py [renders per run]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from api.charts import breakdown_chart, trend_chart
+
+RENDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+POINTS = 1000  # what the report plots after LTTB downsampling
+
+rng = np.random.default_rng(0)
+x = np.arange(POINTS, dtype='float64')
+flowrate = (x, 120 + rng.normal(0, 15, POINTS))
+pressure = (x, 10 + rng.normal(0, 3, POINTS))
+types = ["Pump", "Valve", "Tank", "Exchanger", "Mixer"]
+counts = pd.Series(rng.integers(100, 1000, len(types)), index=types).sort_values(ascending=False)
+flow_by_type = pd.Series(rng.uniform(50, 300, len(types)), index=types)
+
+
+def render(_=None):
+    return trend_chart(flowrate, pressure).getvalue(), breakdown_chart(counts, flow_by_type).getvalue()
+
+
+expected = render()
+for threads in (1, 4, 8):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(render, range(threads)))  # build each thread's figure templates
+        start = time.perf_counter()
+        results = list(pool.map(render, range(RENDERS)))
+        elapsed = time.perf_counter() - start
+    assert all(r == expected for r in results), "threaded render differs from single-threaded output"
+    print(f"{threads} thread(s): {RENDERS / elapsed:6.1f} reports/s ({elapsed / RENDERS * 1000:.1f} ms each)")
@@ -0,0 +1,49 @@
+"""EquipmentRecord storage size and per-type group-by latency.
+
+Prints the size of the records table and its indexes, then times the grouped
+aggregate behind the stats endpoint (``api.summary._type_aggregates``) for each
+given dataset.
+
+    python benchmark_records.py <dataset id> [<dataset id> ...]
+"""
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection
+
+from api.models import EquipmentRecord
+from api.summary import _type_aggregates
+
+RUNS = 5
+table = EquipmentRecord._meta.db_table
+
+with connection.cursor() as cursor:
+    if connection.vendor == 'postgresql':
+        cursor.execute("SELECT pg_relation_size(%s), pg_indexes_size(%s)", [table, table])
+        data, indexes = cursor.fetchone()
+    elif connection.vendor == 'sqlite':
+        cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [table])
+        data, = cursor.fetchone()
+        cursor.execute("SELECT SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+                       "WHERE m.type = 'index' AND m.tbl_name = %s", [table])
+        indexes, = cursor.fetchone()
+    else:
+        data = indexes = None
+if data is not None:
+    print(f"{table}: {data / 2**20:.1f} MB data, {(indexes or 0) / 2**20:.1f} MB indexes")
+
+for dataset_id in map(int, sys.argv[1:]):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        groups = list(_type_aggregates(dataset_id))
+        timings.append(time.perf_counter() - start)
+    rows = sum(g['count'] for g in groups)
+    print(f"dataset {dataset_id}: {rows:,} rows, {len(groups)} types, "
+          f"group-by best {min(timings) * 1000:.0f} ms / median {sorted(timings)[RUNS // 2] * 1000:.0f} ms")
@@ -0,0 +1,33 @@
+"""Report render time and file size with PNG vs vector charts.
+
+Renders the full report of each given (ready) dataset both ways into a
+temporary directory; the cache is not touched.
+
+    python benchmark_reports.py <dataset id> [<dataset id> ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from api.reports import render_report
+from api.summary import get_summary
+
+print(f"{'dataset':>8} {'rows':>9} {'charts':>7} {'seconds':>8} {'size (KB)':>10}")
+with tempfile.TemporaryDirectory() as tmp:
+    for dataset_id in map(int, sys.argv[1:]):
+        rows = get_summary(dataset_id).total_count
+        render_report(dataset_id, os.path.join(tmp, 'warmup.pdf'), vector=False)  # imports, fonts, templates
+        render_report(dataset_id, os.path.join(tmp, 'warmup.pdf'), vector=True)
+        for vector in (False, True):
+            path = os.path.join(tmp, f'{dataset_id}_{vector}.pdf')
+            start = time.perf_counter()
+            render_report(dataset_id, path, vector=vector)
+            elapsed = time.perf_counter() - start
+            print(f"{dataset_id:>8} {rows:>9,} {'vector' if vector else 'png':>7} "
+                  f"{elapsed:>8.2f} {os.path.getsize(path) / 1024:>10.1f}")
@@ -139,6 +139,32 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# CSV ingestion: rows parsed per pandas chunk / rows per INSERT batch
+INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', '50000'))
+INGEST_BATCH_ROWS = int(os.getenv('INGEST_BATCH_ROWS', '5000'))
+# Background ingestion threads per server process
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+# Seconds after which a pending/running ingest job is taken for dead (its
+# worker went away in a restart) and failed by the next retention sweep
+INGEST_JOB_TIMEOUT = int(os.getenv('INGEST_JOB_TIMEOUT', '3600'))
+# PDF render processes per server process, and the cap on queued + running renders
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+REPORT_QUEUE_LIMIT = int(os.getenv('REPORT_QUEUE_LIMIT', '8'))
+# Seconds after which a queued/running render is taken for dead: it no longer
+# counts towards REPORT_QUEUE_LIMIT or gets reused, and is failed
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', '900'))
+# Draw report charts as PDF vector graphics instead of 150 dpi PNGs
+REPORT_VECTOR_CHARTS = os.getenv('REPORT_VECTOR_CHARTS', 'False') == 'True'
+# Datasets kept per user, and records removed per DELETE when a dataset is deleted
+DATASET_RETENTION = int(os.getenv('DATASET_RETENTION', '5'))
+DELETE_CHUNK_ROWS = int(os.getenv('DELETE_CHUNK_ROWS', '10000'))
+# Seconds after which a pending/running delete job is taken for dead and its
+# dataset handed back as failed (deleted again by the next retention sweep)
+DELETE_JOB_TIMEOUT = int(os.getenv('DELETE_JOB_TIMEOUT', '3600'))
+# Sweep expired datasets on a background thread after each upload; turn off
+# when `manage.py sweep_datasets` runs from cron instead
+RETENTION_SWEEP_ON_UPLOAD = os.getenv('RETENTION_SWEEP_ON_UPLOAD', 'True') == 'True'
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
@@ -0,0 +1,15 @@
+# Gunicorn settings, read automatically when gunicorn is started from this
+# directory: gunicorn core.wsgi:application --bind 0.0.0.0:$PORT
+import os
+
+# Threaded workers: the report ZIP streams for as long as its uncached reports
+# take to render (minutes for large datasets). A sync worker would be killed
+# by the timeout mid-stream and could serve nothing else meanwhile; a gthread
+# worker keeps answering the master from its main thread and serves other
+# requests on its remaining threads.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# Seconds of silence before a worker is taken for hung and restarted
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '600'))
+graceful_timeout = 60
@@ -0,0 +1,32 @@
+"""Decoder for the backend's columnar records format (Accept: application/vnd.chemviz.columns).
+
+See backend/api/columnar.py for the byte layout. Numeric columns and
+dictionary codes are wrapped with numpy.frombuffer, i.e. without copying.
+"""
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+MEDIA_TYPE = 'application/vnd.chemviz.columns'
+MAGIC = b'CVZC'
+
+
+def decode_columns(buf):
+    """Decode a columnar payload into a pandas DataFrame."""
+    if buf[:4] != MAGIC:
+        raise ValueError("Not a columnar records payload")
+    (header_len,) = struct.unpack_from('<I', buf, 4)
+    header = json.loads(bytes(buf[8:8 + header_len]))
+    body = 8 + header_len
+    rows = header['rows']
+
+    columns = {}
+    for spec in header['columns']:
+        data = np.frombuffer(buf, dtype=np.dtype(spec['dtype']), count=rows,
+                             offset=body + spec['offset'])
+        if 'dictionary' in spec:
+            data = pd.Categorical.from_codes(data, categories=spec['dictionary'])
+        columns[spec['name']] = data
+    return pd.DataFrame(columns, copy=False)
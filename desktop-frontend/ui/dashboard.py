@@ -1,17 +1,23 @@
 import os
+import time
 import requests
 import pandas as pd
 import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QTableWidget, QTableWidgetItem, 
                              QFileDialog, QTabWidget, QMessageBox, QListWidget, QListWidgetItem,
                              QFrame, QGridLayout, QHeaderView, QAbstractItemView, QStackedWidget, QScrollArea, QComboBox)
 from PyQt5.QtCore import Qt, QUrl
 from PyQt5.QtGui import QColor, QBrush, QFont, QIcon, QDesktopServices
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.colors import LinearSegmentedColormap, LogNorm
 from matplotlib.figure import Figure
 
 from config import API_URL
+from columnar import decode_columns, MEDIA_TYPE as COLUMNAR_MEDIA_TYPE
+
+DENSITY_BINS = 60  # per axis of the scatter heatmap
+DENSITY_CMAP = LinearSegmentedColormap.from_list('density', ['#ccfbf1', '#0d9488'])
 
 # Set style
 plt.style.use('seaborn-v0_8-whitegrid')
@@ -75,6 +81,13 @@ class MainWindow(QMainWindow):
         self.btn_upload.clicked.connect(self.upload_csv)
         sidebar_layout.addWidget(self.btn_upload)
 
+        # Export every listed dataset's report as one ZIP
+        self.btn_export_all = QPushButton("Export All Reports")
+        self.btn_export_all.setObjectName("secondary")
+        self.btn_export_all.setCursor(Qt.PointingHandCursor)
+        self.btn_export_all.clicked.connect(self.download_all_reports)
+        sidebar_layout.addWidget(self.btn_export_all)
+
         # Connect Group
         sidebar_layout.addSpacing(20)
         lbl_connect = QLabel("CONNECT")
@@ -228,6 +241,9 @@ class MainWindow(QMainWindow):
         
         self.current_dataset_id = None
         self.df = None # Store dataframe
+        self.stats = None # Latest /stats/ payload
+        self.correlation = None # Latest /correlation/ payload
+        self.densities = {} # /histogram/ payloads by (x, y) metric pair
         self.refresh_datasets()
         self.fetch_user_details()
 
@@ -276,15 +292,45 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(e)
 
+    def wait_for_job(self, job_id, timeout=600, message="Processing dataset..."):
+        """Poll /jobs/<id>/ until the background job finishes; returns the final job dict."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            resp = requests.get(f"{API_URL}jobs/{job_id}/", headers=self.headers)
+            resp.raise_for_status()
+            job = resp.json()
+            if job['status'] in ('done', 'failed'):
+                return job
+            if job['kind'] == 'ingest':
+                self.statusBar().showMessage(f"{message} {job['rows_processed']:,} rows")
+            else:
+                self.statusBar().showMessage(message)
+            QApplication.processEvents()
+            time.sleep(0.5)
+        raise TimeoutError("Timed out waiting for the server to process the dataset.")
+
+    def finish_upload(self, resp):
+        """Wait for an accepted upload to be ingested. Returns True when the dataset is ready."""
+        job_id = resp.json().get('job')
+        if resp.status_code == 202 and job_id:
+            job = self.wait_for_job(job_id)
+            self.statusBar().clearMessage()
+            if job['status'] == 'failed':
+                QMessageBox.warning(self, "Upload Failed", job['error'])
+                self.refresh_datasets()
+                return False
+        return True
+
     def upload_csv(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV", "", "CSV Files (*.csv)")
         if file_path:
             files = {'file': open(file_path, 'rb')}
             try:
                 resp = requests.post(API_URL + "upload/", headers=self.headers, files=files)
-                if resp.status_code == 201:
-                    QMessageBox.information(self, "Success", "File uploaded successfully.")
-                    self.refresh_datasets()
+                if resp.status_code in (201, 202):
+                    if self.finish_upload(resp):
+                        QMessageBox.information(self, "Success", "File uploaded successfully.")
+                        self.refresh_datasets()
                 else:
                     QMessageBox.warning(self, "Upload Failed", resp.text)
             except Exception as e:
@@ -307,7 +353,10 @@ class MainWindow(QMainWindow):
             files = {'file': open(sample_path, 'rb')}
             resp = requests.post(API_URL + "upload/", headers=self.headers, files=files)
             
-            if resp.status_code == 201:
+            if resp.status_code in (201, 202):
+                if not self.finish_upload(resp):
+                    return
+                
                 # Refresh dataset list
                 self.refresh_datasets()
                 
@@ -347,20 +396,27 @@ class MainWindow(QMainWindow):
         
         # Load data first to populate df
         self.load_data(dataset_id) 
+        self.correlation = self.load_correlation(dataset_id)
+        self.densities = {}
         self.load_stats(dataset_id)
 
     def load_data(self, id):
         try:
-            resp = requests.get(f"{API_URL}datasets/{id}/data/", headers=self.headers)
+            # Columnar binary payload decodes straight into NumPy-backed columns
+            resp = requests.get(f"{API_URL}datasets/{id}/data/",
+                                params={'fields': 'equipment_name,equipment_type,flowrate,pressure,temperature'},
+                                headers={**self.headers, 'Accept': COLUMNAR_MEDIA_TYPE})
             if resp.status_code == 200:
-                data = resp.json()
-                if isinstance(data, dict) and 'results' in data: 
-                    data = data['results']
-                
-                # Create DataFrame for Analysis
-                self.df = pd.DataFrame(data)
+                if resp.headers.get('Content-Type', '').startswith(COLUMNAR_MEDIA_TYPE):
+                    self.df = decode_columns(resp.content)
+                else:
+                    data = resp.json()
+                    if isinstance(data, dict) and 'results' in data: 
+                        data = data['results']
+                    self.df = pd.DataFrame(data)
+                df = self.df
                 
-                self.table.setRowCount(len(data))
+                self.table.setRowCount(len(df))
                 self.table.setColumnCount(5)
                 self.table.setHorizontalHeaderLabels(["EQUIPMENT NAME", "TYPE", "FLOWRATE (L/min)", "PRESSURE (PSI)", "TEMP (°C)"])
                 
@@ -368,26 +424,59 @@ class MainWindow(QMainWindow):
                 header.setSectionResizeMode(0, QHeaderView.Stretch)
                 header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
                 
-                for i, row in enumerate(data):
-                    self.table.setItem(i, 0, QTableWidgetItem(str(row['equipment_name'])))
-                    type_item = QTableWidgetItem(str(row['equipment_type']))
+                rows = zip(df['equipment_name'], df['equipment_type'], df['flowrate'], df['pressure'], df['temperature'])
+                for i, (name, eq_type, flowrate, pressure, temperature) in enumerate(rows):
+                    self.table.setItem(i, 0, QTableWidgetItem(str(name)))
+                    type_item = QTableWidgetItem(str(eq_type))
                     type_item.setTextAlignment(Qt.AlignCenter)
                     self.table.setItem(i, 1, type_item)
-                    self.table.setItem(i, 2, QTableWidgetItem(f"{row['flowrate']:.1f}"))
-                    self.table.setItem(i, 3, QTableWidgetItem(f"{row['pressure']:.1f}"))
-                    temp_item = QTableWidgetItem(f"{row['temperature']:.1f}")
-                    if row['temperature'] > 100:
+                    self.table.setItem(i, 2, QTableWidgetItem(f"{flowrate:.1f}"))
+                    self.table.setItem(i, 3, QTableWidgetItem(f"{pressure:.1f}"))
+                    temp_item = QTableWidgetItem(f"{temperature:.1f}")
+                    if temperature > 100:
                         temp_item.setForeground(QBrush(QColor('#ef4444'))) 
                         temp_item.setFont(QFont("Segoe UI", 9, QFont.Bold))
                     self.table.setItem(i, 4, temp_item)
         except Exception as e:
             print(f"Error loading data: {e}")
 
+    def load_series(self, id, metrics, points=1000):
+        try:
+            resp = requests.get(f"{API_URL}datasets/{id}/series/", headers=self.headers,
+                                params={'metric': metrics, 'points': points})
+            if resp.status_code == 200:
+                return resp.json()['series']
+        except Exception as e:
+            print(f"Error loading series: {e}")
+        return None
+
+    def load_correlation(self, id):
+        try:
+            resp = requests.get(f"{API_URL}datasets/{id}/correlation/", headers=self.headers)
+            if resp.status_code == 200:
+                return resp.json()
+        except Exception as e:
+            print(f"Error loading correlation: {e}")
+        return None
+
+    def load_density(self, id, x, y):
+        # Binned counts of a metric pair, fetched once per pair and dataset
+        if (x, y) not in self.densities:
+            try:
+                resp = requests.get(f"{API_URL}datasets/{id}/histogram/", headers=self.headers,
+                                    params={'x': x, 'y': y, 'bins': DENSITY_BINS})
+                if resp.status_code == 200:
+                    self.densities[(x, y)] = resp.json()
+            except Exception as e:
+                print(f"Error loading density: {e}")
+        return self.densities.get((x, y))
+
     def load_stats(self, id):
         try:
             resp = requests.get(f"{API_URL}datasets/{id}/stats/", headers=self.headers)
             if resp.status_code == 200:
                  stats = resp.json()
+                 self.stats = stats
                  
                  # Clear existing dashboard
                  while self.dashboard_layout.count():
@@ -504,15 +593,16 @@ class MainWindow(QMainWindow):
                  trend_fig.patch.set_facecolor('white')
                  trend_canvas = FigureCanvas(trend_fig)
                  
-                 if self.df is not None and not self.df.empty:
+                 # Server-side LTTB downsample: bounded point count whatever the dataset size
+                 series = self.load_series(id, "flowrate,pressure")
+                 if series:
                     ax_trend = trend_fig.add_subplot(111)
-                    flow = self.df['flowrate']
-                    press = self.df['pressure']
-                    x = range(len(self.df))
+                    flow = series['flowrate']
+                    press = series['pressure']
                     
-                    ax_trend.plot(x, flow, label='Flowrate', color='#0d9488', linewidth=2)
-                    ax_trend.fill_between(x, flow, color='#0d9488', alpha=0.1)
-                    ax_trend.plot(x, press, label='Pressure', color='#f59e0b', linestyle='--', linewidth=2)
+                    ax_trend.plot(flow['x'], flow['y'], label='Flowrate', color='#0d9488', linewidth=2)
+                    ax_trend.fill_between(flow['x'], flow['y'], color='#0d9488', alpha=0.1)
+                    ax_trend.plot(press['x'], press['y'], label='Pressure', color='#f59e0b', linestyle='--', linewidth=2)
                     
                     ax_trend.set_facecolor('white')
                     ax_trend.grid(True, linestyle=':', alpha=0.6)
@@ -568,15 +658,16 @@ class MainWindow(QMainWindow):
                 print(f"Response Content: {resp.text}")
 
     def update_bar_chart(self, metric_text):
-        if self.df is None or self.df.empty: return
+        if not self.stats or not self.stats.get('type_means'): return
         
         metric_map = {"Flowrate": "flowrate", "Pressure": "pressure", "Temperature": "temperature"}
         metric = metric_map.get(metric_text, "flowrate")
         
         self.lbl_bar_title.setText(f"Average {metric_text} by Equipment")
         
-        # Aggregate logic
-        avg_df = self.df.groupby("equipment_type")[metric].mean()
+        # Per-type means come precomputed from the stats endpoint
+        type_means = self.stats['type_means']
+        avg_df = pd.Series({t: means[metric] for t, means in type_means.items()})
         
         self.bar_fig.clear()
         ax = self.bar_fig.add_subplot(111)
@@ -606,7 +697,24 @@ class MainWindow(QMainWindow):
         self.scatter_fig.clear()
         ax = self.scatter_fig.add_subplot(111)
         
-        ax.scatter(self.df[x_col], self.df[y_col], c='#0d9488', alpha=0.6, edgecolors='none')
+        # Grid density from the server instead of one marker per reading;
+        # empty cells fall outside the log norm and stay transparent
+        density = self.load_density(self.current_dataset_id, x_col, y_col)
+        if density:
+            counts_yx = list(zip(*density['counts']))
+            ax.pcolormesh(density['x_edges'], density['y_edges'], counts_yx, cmap=DENSITY_CMAP, norm=LogNorm(vmin=1))
+        
+        # Coefficients and least-squares line computed server-side
+        corr = self.correlation
+        if corr and x_col in corr['metrics'] and y_col in corr['metrics']:
+            i, j = corr['metrics'].index(x_col), corr['metrics'].index(y_col)
+            r, rho = corr['pearson'][i][j], corr['spearman'][i][j]
+            if r is not None and rho is not None:
+                self.lbl_scatter_title.setText(f"{x_text} vs {y_text}  (r={r:.2f}, ρ={rho:.2f})")
+            fit = next((f for f in corr['fits'] if f['x'] == x_col and f['y'] == y_col), None)
+            if fit and fit['slope'] is not None and density:
+                xs = [density['x_edges'][0], density['x_edges'][-1]]
+                ax.plot(xs, [fit['slope'] * x + fit['intercept'] for x in xs], color='#f59e0b', linewidth=2)
         
         ax.set_xlabel(x_text[:4])
         ax.set_ylabel(y_text[:4])
@@ -619,7 +727,18 @@ class MainWindow(QMainWindow):
     def download_pdf(self):
         if not self.current_dataset_id: return
         try:
-            resp = requests.get(f"{API_URL}datasets/{self.current_dataset_id}/pdf/", headers=self.headers)
+            # Queue the render, wait for it, then download the cached report
+            url = f"{API_URL}datasets/{self.current_dataset_id}/pdf/"
+            resp = requests.post(url, headers=self.headers)
+            resp.raise_for_status()
+            job = resp.json()
+            if job['status'] != 'done':
+                job = self.wait_for_job(job['id'], message="Generating report...")
+                self.statusBar().clearMessage()
+            if job['status'] == 'failed':
+                QMessageBox.warning(self, "Report Failed", job['error'])
+                return
+            resp = requests.get(url, headers=self.headers)
             if resp.status_code == 200:
                 # Construct default filename: filename.csv -> filename_report.pdf
                 bg_filename = getattr(self, 'current_dataset_filename', f'dataset_{self.current_dataset_id}')
@@ -633,3 +752,27 @@ class MainWindow(QMainWindow):
                     QMessageBox.information(self, "Success", "PDF Report saved successfully.")
         except Exception as e:
              QMessageBox.critical(self, "Error", str(e))
+
+    def download_all_reports(self):
+        ids = [self.list_datasets.item(i).data(Qt.UserRole) for i in range(self.list_datasets.count())]
+        if not ids: return
+        path, _ = QFileDialog.getSaveFileName(self, "Save All Reports", "ChemViz_Reports.zip", "ZIP Archives (*.zip)")
+        if not path: return
+        try:
+            # The archive streams while the server renders, so write it as it arrives
+            params = {'ids': ','.join(map(str, ids))}
+            with requests.get(f"{API_URL}datasets/reports/", params=params, headers=self.headers, stream=True) as resp:
+                if resp.status_code != 200:
+                    QMessageBox.warning(self, "Export Failed", resp.json().get('error', resp.reason))
+                    return
+                received = 0
+                with open(path, 'wb') as f:
+                    for chunk in resp.iter_content(chunk_size=256 * 1024):
+                        f.write(chunk)
+                        received += len(chunk)
+                        self.statusBar().showMessage(f"Downloading reports... {received / 1e6:.1f} MB")
+                        QApplication.processEvents()
+            self.statusBar().clearMessage()
+            QMessageBox.information(self, "Success", "Reports saved successfully.")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
@@ -17,4 +17,47 @@ api.interceptors.request.use(
     (error) => Promise.reject(error)
 );
 
+// Poll a background job (/api/jobs/<id>/) until it is done or failed, giving
+// up after `timeout` ms (a job whose server worker died never finishes).
+export const waitForJob = async (jobId, { interval = 1000, timeout = 600000, onProgress } = {}) => {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+        const { data: job } = await api.get(`api/jobs/${jobId}/`);
+        if (job.status === 'done' || job.status === 'failed') return job;
+        if (onProgress) onProgress(job);
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+    throw new Error('Timed out waiting for the server to finish the job');
+};
+
+// Download a streamed response. Where the browser supports it the file is
+// chosen first and the body is piped to disk as it arrives.
+export const streamDownload = async (path, filename) => {
+    const handle = 'showSaveFilePicker' in window
+        ? await window.showSaveFilePicker({ suggestedName: filename })
+        : null;
+
+    const token = localStorage.getItem('token');
+    const response = await fetch(new URL(path, API_URL), {
+        headers: token ? { Authorization: `Token ${token}` } : {},
+    });
+    if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        throw new Error(body.error || response.statusText);
+    }
+
+    if (handle) {
+        await response.body.pipeTo(await handle.createWritable());
+        return;
+    }
+    const url = window.URL.createObjectURL(await response.blob());
+    const link = document.createElement('a');
+    link.href = url;
+    link.setAttribute('download', filename);
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    window.URL.revokeObjectURL(url);
+};
+
 export default api;
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { waitForJob } from '../api';
 import TrendChart from './charts/TrendChart';
 import DistributionChart from './charts/DistributionChart';
 import CorrelationChart from './charts/CorrelationChart';
@@ -31,6 +31,10 @@ ChartJS.register(
   Legend
 );
 
+const DENSITY_BINS = 40; // per axis of the correlation heatmaps
+const LOG_PAGE_ROWS = 100; // equipment log rows fetched per page (keyset pagination)
+const CORRELATION_PAIRS = [['pressure', 'temperature'], ['flowrate', 'pressure'], ['flowrate', 'temperature']];
+
 // SVGs for cards
 const FlowIcon = () => (
     <svg className="h-6 w-6 text-primary-500" fill="none" viewBox="0 0 24 24" stroke="currentColor">
@@ -49,9 +53,18 @@ const TempIcon = () => (
     </svg>
 );
 
+// Cursor of a page's `next` link (null on the last page); requested against our
+// own base URL rather than the absolute link the server built
+const cursorOf = (next) => next && new URL(next).searchParams.get('cursor');
+
 export default function Analysis({ datasetId }) {
     const [stats, setStats] = useState(null);
     const [records, setRecords] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [series, setSeries] = useState(null);
+    const [correlation, setCorrelation] = useState(null);
+    const [densities, setDensities] = useState({});
     const [loading, setLoading] = useState(true);
     const [exporting, setExporting] = useState(false);
 
@@ -67,11 +80,18 @@ export default function Analysis({ datasetId }) {
         
         Promise.all([
             api.get(`api/datasets/${datasetId}/stats/`),
-            api.get(`api/datasets/${datasetId}/data/`),
+            api.get(`api/datasets/${datasetId}/data/`, { params: { limit: LOG_PAGE_ROWS } }),
+            api.get(`api/datasets/${datasetId}/series/`, {
+                params: { metric: 'flowrate,pressure,temperature', points: 1000 }
+            }),
+            api.get(`api/datasets/${datasetId}/correlation/`),
             minLoadTime
-        ]).then(([statsRes, dataRes]) => {
+        ]).then(([statsRes, dataRes, seriesRes, correlationRes]) => {
             setStats(statsRes.data);
-            setRecords(dataRes.data.results || dataRes.data);
+            setRecords(dataRes.data.results);
+            setNextCursor(cursorOf(dataRes.data.next));
+            setSeries(seriesRes.data.series);
+            setCorrelation(correlationRes.data);
             setLoading(false);
         }).catch(err => {
             console.error(err);
@@ -79,26 +99,64 @@ export default function Analysis({ datasetId }) {
         });
     }, [datasetId]);
 
+    useEffect(() => {
+        // Binned counts of the plotted pairs (/histogram/), sized by the bins rather than the rows
+        if (viewMode !== 'overview' && viewMode !== 'correlations') return;
+        const pairs = viewMode === 'correlations' ? CORRELATION_PAIRS : [[scatterX, scatterY]];
+        let stale = false;
+        Promise.all(pairs.map(([x, y]) => api.get(`api/datasets/${datasetId}/histogram/`, {
+            params: { x, y, bins: DENSITY_BINS }
+        }))).then(responses => {
+            if (!stale) setDensities(Object.fromEntries(responses.map(({ data }) => [`${data.x},${data.y}`, data])));
+        }).catch(err => console.error(err));
+        return () => { stale = true; };
+    }, [datasetId, viewMode, scatterX, scatterY]);
+
+    const loadMoreRecords = async () => {
+        setLoadingMore(true);
+        try {
+            const { data } = await api.get(`api/datasets/${datasetId}/data/`, {
+                params: { limit: LOG_PAGE_ROWS, cursor: nextCursor }
+            });
+            setRecords(loaded => [...loaded, ...data.results]);
+            setNextCursor(cursorOf(data.next));
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const getBarData = (metric = 'flowrate') => {
-        if (!records || records.length === 0) return {};
-        const sums = {};
-        const counts = {};
-        records.forEach(r => {
-            const t = r.equipment_type;
-            if (!sums[t]) { sums[t] = 0; counts[t] = 0; }
-            sums[t] += r[metric];
-            counts[t] += 1;
-        });
+        // Per-type means are computed server-side (stats.type_means)
+        if (!stats || !stats.type_means) return {};
         const avgs = {};
-        Object.keys(sums).forEach(t => {
-            avgs[t] = parseFloat((sums[t] / counts[t]).toFixed(1));
+        Object.entries(stats.type_means).forEach(([t, means]) => {
+            avgs[t] = parseFloat(means[metric].toFixed(1));
         });
         return avgs;
     };
 
+    const getPairCorrelation = (x, y) => {
+        // Coefficients and fit computed server-side (/correlation/)
+        if (!correlation) return undefined;
+        const i = correlation.metrics.indexOf(x);
+        const j = correlation.metrics.indexOf(y);
+        return {
+            pearson: correlation.pearson[i][j],
+            spearman: correlation.spearman[i][j],
+            fit: correlation.fits.find(f => f.x === x && f.y === y),
+        };
+    };
+
     const downloadPDF = async () => {
         setExporting(true);
         try {
+            // Render in the background, then download the cached report
+            const { data: job } = await api.post(`api/datasets/${datasetId}/pdf/`);
+            const finished = job.status === 'done' ? job : await waitForJob(job.id);
+            if (finished.status === 'failed') throw new Error(finished.error);
+
             const response = await api.get(`api/datasets/${datasetId}/pdf/`, {
                 responseType: 'blob',
             });
@@ -345,7 +403,7 @@ export default function Analysis({ datasetId }) {
                                  Let's look at TrendChart source briefly if I could, but I can't in this tool.
                                  However, I can just wrap it and ensure it fills.
                               */}
-                            <TrendChart data={records} title="Live Process Trends (Flow & Pressure)" />
+                            <TrendChart series={series} metrics={['flowrate', 'pressure']} title="Live Process Trends (Flow & Pressure)" />
                          </div>
                     </div>
 
@@ -378,9 +436,9 @@ export default function Analysis({ datasetId }) {
                             </div>
                             <div className="flex-1 min-h-[300px]">
                                 <CorrelationChart 
-                                    data={records} 
+                                    density={densities[`${scatterX},${scatterY}`]}
                                     title="" // Title handled by parent
-                                    xKey={scatterX} yKey={scatterY}
+                                    correlation={getPairCorrelation(scatterX, scatterY)}
                                     xLabel={scatterX.charAt(0).toUpperCase() + scatterX.slice(1)} 
                                     yLabel={scatterY.charAt(0).toUpperCase() + scatterY.slice(1)}
                                 />
@@ -393,9 +451,9 @@ export default function Analysis({ datasetId }) {
             {/* Trends Mode */}
             {viewMode === 'trends' && (
                 <div className="space-y-6">
-                    <TrendChart data={records} title="Flowrate Trend" />
-                    <TrendChart data={records} title="Pressure Trend" />
-                    <TrendChart data={records} title="Temperature Trend" />
+                    <TrendChart series={series} metrics={['flowrate']} title="Flowrate Trend" />
+                    <TrendChart series={series} metrics={['pressure']} title="Pressure Trend" />
+                    <TrendChart series={series} metrics={['temperature']} title="Temperature Trend" />
                 </div>
             )}
 
@@ -413,21 +471,21 @@ export default function Analysis({ datasetId }) {
             {viewMode === 'correlations' && (
                 <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
                     <CorrelationChart 
-                        data={records} 
+                        density={densities['pressure,temperature']}
                         title="Pressure vs Temperature"
-                        xKey="pressure" yKey="temperature"
+                        correlation={getPairCorrelation('pressure', 'temperature')}
                         xLabel="Pressure (PSI)" yLabel="Temperature (°C)"
                     />
                      <CorrelationChart 
-                        data={records} 
+                        density={densities['flowrate,pressure']}
                         title="Flow vs Pressure"
-                        xKey="flowrate" yKey="pressure"
+                        correlation={getPairCorrelation('flowrate', 'pressure')}
                         xLabel="Flowrate (L/min)" yLabel="Pressure (PSI)"
                     />
                      <CorrelationChart 
-                        data={records} 
+                        density={densities['flowrate,temperature']}
                         title="Flow vs Temperature"
-                        xKey="flowrate" yKey="temperature"
+                        correlation={getPairCorrelation('flowrate', 'temperature')}
                         xLabel="Flowrate (L/min)" yLabel="Temperature (°C)"
                     />
                 </div>
@@ -441,7 +499,7 @@ export default function Analysis({ datasetId }) {
                          <p className="text-sm text-slate-500 mt-1">Real-time sensor readings and operational status</p>
                     </div>
                     <span className="px-3 py-1 bg-white border border-slate-200 rounded-lg text-xs font-semibold text-slate-500 uppercase tracking-wider shadow-sm">
-                        {records.length} Records
+                        {records.length} of {stats?.total_count ?? records.length} Records
                     </span>
                 </div>
                 <div className="overflow-x-auto no-scrollbar">
@@ -529,6 +587,17 @@ export default function Analysis({ datasetId }) {
                         </tbody>
                     </table>
                 </div>
+                {nextCursor && (
+                    <div className="px-8 py-4 border-t border-slate-100 flex justify-center bg-slate-50/50">
+                        <button
+                            onClick={loadMoreRecords}
+                            disabled={loadingMore}
+                            className="px-4 py-2 bg-white border border-slate-200 text-slate-600 rounded-xl font-medium text-xs hover:bg-slate-50 disabled:opacity-50 disabled:cursor-not-allowed transition-colors shadow-sm"
+                        >
+                            {loadingMore ? 'Loading...' : `Load ${LOG_PAGE_ROWS} more`}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -1,15 +1,17 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { streamDownload, waitForJob } from '../api';
 import ProcessingOverlay from './ui/ProcessingOverlay';
 import Skeleton from './ui/Skeleton';
 
 export default function Dashboard({ onSelect }) {
     const [datasets, setDatasets] = useState([]);
     const [uploading, setUploading] = useState(false);
+    const [uploadMessage, setUploadMessage] = useState('Uploading & Analyzing Dataset...');
     const [loadingData, setLoadingData] = useState(true);
     const [file, setFile] = useState(null);
     const [activeTab, setActiveTab] = useState('my'); // 'my' or 'global'
     const [isDragging, setIsDragging] = useState(false);
+    const [exporting, setExporting] = useState(false);
 
     const [user, setUser] = useState(null);
     const [showProfile, setShowProfile] = useState(false);
@@ -67,13 +69,22 @@ export default function Dashboard({ onSelect }) {
         formData.append('file', file);
 
         setUploading(true);
+        setUploadMessage('Uploading & Analyzing Dataset...');
         try {
-            await Promise.all([
+            const [res] = await Promise.all([
                 api.post('api/upload/', formData, {
                     headers: { 'Content-Type': 'multipart/form-data' }
                 }),
                 new Promise(resolve => setTimeout(resolve, 2000)) // Artificial delay for UX
             ]);
+
+            // Rows are ingested in the background; wait for the job to finish
+            if (res.data.job) {
+                const job = await waitForJob(res.data.job, {
+                    onProgress: (j) => setUploadMessage(`Processing Dataset... ${j.rows_processed.toLocaleString()} rows`),
+                });
+                if (job.status === 'failed') throw new Error(job.error);
+            }
             
             setFile(null);
             if (activeTab === 'my') fetchDatasets();
@@ -85,9 +96,22 @@ export default function Dashboard({ onSelect }) {
         }
     };
 
+    const exportAllReports = async () => {
+        const ids = datasets.filter(ds => ds.status === 'ready').map(ds => ds.id);
+        if (ids.length === 0) return;
+        setExporting(true);
+        try {
+            await streamDownload(`api/datasets/reports/?ids=${ids.join(',')}`, 'ChemViz_Reports.zip');
+        } catch (err) {
+            if (err.name !== 'AbortError') alert('Export failed: ' + err.message);
+        } finally {
+            setExporting(false);
+        }
+    };
+
     return (
         <div className="space-y-8 max-w-[1200px] mx-auto pb-12 relative">
-            <ProcessingOverlay isProcessing={uploading} message="Uploading & Analyzing Dataset..." />
+            <ProcessingOverlay isProcessing={uploading} message={uploadMessage} />
             
             {/* Header */}
             <div className="flex flex-col md:flex-row md:items-center justify-between gap-4">
@@ -212,6 +236,14 @@ export default function Dashboard({ onSelect }) {
             <div>
                  <div className="flex items-center justify-between mb-4">
                      <h2 className="text-lg font-bold text-slate-900">Recent Datasets</h2>
+                     <div className="flex items-center gap-3">
+                     <button
+                        onClick={exportAllReports}
+                        disabled={exporting || datasets.length === 0}
+                        className="px-4 py-2 bg-white border border-slate-200 text-slate-600 rounded-xl font-medium text-xs hover:bg-slate-50 disabled:opacity-50 disabled:cursor-not-allowed transition-colors shadow-sm"
+                     >
+                        {exporting ? 'Exporting...' : 'Export All Reports'}
+                     </button>
                      <div className="bg-white p-1 rounded-xl shadow-sm border border-slate-100 flex">
                          <button
                             onClick={() => setActiveTab('my')}
@@ -226,6 +258,7 @@ export default function Dashboard({ onSelect }) {
                             Global
                         </button>
                      </div>
+                     </div>
                  </div>
 
                  <div className="bg-white shadow-sm border border-slate-100 rounded-2xl overflow-hidden min-h-[300px]">
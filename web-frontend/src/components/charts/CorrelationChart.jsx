@@ -10,21 +10,78 @@ import {
 
 ChartJS.register(LinearScale, PointElement, LineElement, Tooltip, Legend);
 
-export default function CorrelationChart({ data, title = "Pressure vs Temp", xKey='pressure', yKey='temperature', xLabel='Pressure (PSI)', yLabel='Temperature (°C)' }) {
+const formatCoefficient = (value) => (value === null || value === undefined ? '–' : value.toFixed(2));
+const formatEdge = (value) => Number(value.toPrecision(4));
 
-    const chartData = {
-        datasets: [
-            {
-                label: 'Readings',
-                data: data.map(r => ({ x: r[xKey], y: r[yKey] })),
-                backgroundColor: 'rgba(13, 148, 136, 0.4)', // Teal with higher transparency
-                borderColor: 'rgba(13, 148, 136, 0.8)',
-                borderWidth: 1,
-                pointRadius: 5,
-                pointHoverRadius: 7,
+// Fills every grid cell of dataset 0 in its own colour, under the other datasets
+const densityCells = {
+    id: 'densityCells',
+    beforeDatasetsDraw(chart) {
+        const { ctx, chartArea, scales: { x, y } } = chart;
+        ctx.save();
+        ctx.beginPath();
+        ctx.rect(chartArea.left, chartArea.top, chartArea.width, chartArea.height);
+        ctx.clip();
+        chart.data.datasets[0].data.forEach(cell => {
+            const left = x.getPixelForValue(cell.x0);
+            const top = y.getPixelForValue(cell.y1);
+            ctx.fillStyle = cell.color;
+            // Half a pixel of overlap so neighbouring cells leave no seams
+            ctx.fillRect(left, top, x.getPixelForValue(cell.x1) - left + 0.5, y.getPixelForValue(cell.y0) - top + 0.5);
+        });
+        ctx.restore();
+    },
+};
+
+// `density`: binned counts of this pair from /histogram/ (x_edges, y_edges, counts[i][j])
+// `correlation`: { pearson, spearman, fit: { slope, intercept, r2 } } for this pair, from /correlation/
+export default function CorrelationChart({ density, title = "Pressure vs Temp", xLabel='Pressure (PSI)', yLabel='Temperature (°C)', correlation }) {
+
+    // One cell per non-empty bin, shaded on a log scale so sparse regions stay visible
+    const cells = [];
+    if (density) {
+        const { x_edges: xEdges, y_edges: yEdges, counts } = density;
+        const scale = Math.log1p(Math.max(...counts.map(row => Math.max(...row))));
+        counts.forEach((row, i) => row.forEach((count, j) => {
+            if (count === 0) return;
+            cells.push({
+                x: (xEdges[i] + xEdges[i + 1]) / 2,
+                y: (yEdges[j] + yEdges[j + 1]) / 2,
+                x0: xEdges[i], x1: xEdges[i + 1], y0: yEdges[j], y1: yEdges[j + 1],
+                count,
+                color: `rgba(13, 148, 136, ${(0.1 + 0.9 * Math.log1p(count) / scale).toFixed(3)})`, // Teal
+            });
+        }));
+    }
+    const datasets = [
+        {
+            label: 'Readings',
+            data: cells,
+            pointRadius: 0, // drawn by the densityCells plugin
+            pointHoverRadius: 0,
+            pointHitRadius: (context) => {
+                const { chartArea } = context.chart;
+                return chartArea && density ? chartArea.width / density.x_edges.length / 2 : 4;
             },
-        ],
-    };
+        },
+    ];
+
+    const fit = correlation?.fit;
+    if (fit && fit.slope !== null && density) {
+        // Least-squares line across the binned x range
+        const [minX, maxX] = [density.x_edges[0], density.x_edges.at(-1)];
+        datasets.push({
+            label: 'Linear fit',
+            data: [minX, maxX].map(x => ({ x, y: fit.slope * x + fit.intercept })),
+            showLine: true,
+            borderColor: 'rgba(245, 158, 11, 0.9)', // Amber
+            borderWidth: 2,
+            pointRadius: 0,
+            pointHoverRadius: 0,
+        });
+    }
+
+    const chartData = { datasets };
 
     const options = {
         responsive: true,
@@ -39,8 +96,12 @@ export default function CorrelationChart({ data, title = "Pressure vs Temp", xKe
                 borderColor: '#e2e8f0',
                 borderWidth: 1,
                 padding: 10,
+                filter: (item) => item.datasetIndex === 0,
                 callbacks: {
-                    label: (context) => `${xLabel.split(' ')[0]}: ${context.raw.x}, ${yLabel.split(' ')[0]}: ${context.raw.y}`
+                    label: (context) => {
+                        const { x0, x1, y0, y1, count } = context.raw;
+                        return `${xLabel.split(' ')[0]}: ${formatEdge(x0)}–${formatEdge(x1)}, ${yLabel.split(' ')[0]}: ${formatEdge(y0)}–${formatEdge(y1)} · ${count} readings`;
+                    }
                 }
             }
         },
@@ -48,12 +109,16 @@ export default function CorrelationChart({ data, title = "Pressure vs Temp", xKe
             x: {
                 type: 'linear',
                 position: 'bottom',
+                min: density?.x_edges[0],
+                max: density?.x_edges.at(-1),
                 title: { display: true, text: xLabel, color: '#94a3b8', font: { size: 10 } },
                 grid: { color: '#f1f5f9' },
                 ticks: { color: '#64748b', font: { size: 10 } },
                 border: { display: false }
             },
             y: {
+                min: density?.y_edges[0],
+                max: density?.y_edges.at(-1),
                 title: { display: true, text: yLabel, color: '#94a3b8', font: { size: 10 } },
                 grid: { color: '#f1f5f9' },
                 ticks: { color: '#64748b', font: { size: 10 } },
@@ -65,8 +130,14 @@ export default function CorrelationChart({ data, title = "Pressure vs Temp", xKe
     return (
         <div className="bg-white p-6 rounded-2xl shadow-sm border border-slate-100 h-80">
             <h3 className="text-lg font-bold text-slate-800 mb-4">{title}</h3>
+            {correlation && (
+                <p className="text-xs font-semibold text-slate-500 mb-2">
+                    Pearson r = {formatCoefficient(correlation.pearson)} · Spearman ρ = {formatCoefficient(correlation.spearman)}
+                    {fit && <> · R² = {formatCoefficient(fit.r2)}</>}
+                </p>
+            )}
             <div className="h-full pb-6">
-                <Scatter data={chartData} options={options} />
+                <Scatter data={chartData} options={options} plugins={[densityCells]} />
             </div>
         </div>
     );
@@ -23,7 +23,9 @@ ChartJS.register(
   Filler
 );
 
-export default function TrendChart({ data, title = "Process Trends" }) {
+export default function TrendChart({ series, metrics = ['flowrate', 'pressure', 'temperature'], title = "Process Trends" }) {
+    // series: { flowrate: { x: [...], y: [...] }, ... } from /datasets/<id>/series/ (LTTB downsampled)
+    const metricKey = metrics.join(',');
     const chartRef = useRef(null);
     const [chartData, setChartData] = useState({ datasets: [] });
 
@@ -46,13 +48,14 @@ export default function TrendChart({ data, title = "Process Trends" }) {
             temperature: { label: 'Temperature (°C)', color: '#f43f5e', bg: 'transparent', fill: false, axis: 'y' }
         };
 
-        const datasets = (data && data[0]) ? Object.keys(metricConfigs)
-            .filter(key => data[0].hasOwnProperty(key)) // Only metrics present in data
+        const datasets = series ? Object.keys(metricConfigs)
+            .filter(key => metrics.includes(key) && series.hasOwnProperty(key)) // Only metrics present in data
             .map(key => {
                  const config = metricConfigs[key];
+                 const { x, y } = series[key];
                  return {
                     label: config.label,
-                    data: data.map(r => r[key]),
+                    data: x.map((xi, i) => ({ x: xi + 1, y: y[i] })),
                     borderColor: config.color,
                     backgroundColor: config.bg,
                     fill: config.fill,
@@ -66,17 +69,19 @@ export default function TrendChart({ data, title = "Process Trends" }) {
             }) : [];
 
         setChartData({
-            labels: data.map((_, i) => i + 1),
             datasets: datasets
         });
 
-    }, [data]);
+    }, [series, metricKey]);
+
+    const hasData = series && metrics.some(key => series[key] && series[key].x.length > 0);
 
     const options = {
         responsive: true,
         maintainAspectRatio: false,
         interaction: {
-            mode: 'index',
+            mode: 'nearest',
+            axis: 'x',
             intersect: false,
         },
         plugins: {
@@ -103,6 +108,7 @@ export default function TrendChart({ data, title = "Process Trends" }) {
         },
         scales: {
             x: { 
+                type: 'linear',
                 grid: { display: false }, 
                 ticks: { display: false } // Hide x-axis labels if too many
             },
@@ -130,7 +136,7 @@ export default function TrendChart({ data, title = "Process Trends" }) {
             <h3 className="text-lg font-bold text-slate-800 mb-2">{title}</h3>
             <div className="flex-1 min-h-0 relative">
                  {/* Only render if we have data to avoid gradient errors on empty init */}
-                 {data.length > 0 && 
+                 {hasData && 
                     <Line ref={chartRef} data={chartData} options={options} />
                  }
             </div>